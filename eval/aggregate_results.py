@@ -3,10 +3,59 @@
 Aggregate experiment results into summary CSV for plotting.
 """
 
+import io
+import os
+import re
 import json
 import pandas as pd
 from pathlib import Path
-import glob
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_FN_RE = re.compile(r'^(map_[a-z]+)_([a-z_]+?)_(\d+)')
+_CONTAINER_EVENTS = {'start_map', 'end_map', 'start_array', 'end_array', 'map_key'}
+
+def load_result_metrics(file_path):
+    """
+    Load the top-level scalar metrics of a raw result file.
+    
+    The (potentially huge) transcript is never materialized: with ijson the
+    file is stream-parsed and only scalar values directly under the root
+    object are kept.
+    """
+    with open(file_path, 'rb') as f:
+        if ijson is None:
+            data = json.load(f)
+            data.pop('transcript', None)
+            return data
+        
+        data = {}
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix and '.' not in prefix and event not in _CONTAINER_EVENTS:
+                data[prefix] = value
+        return data
+
+def _load_one(candidate):
+    """Load one raw result file and tag it with metadata parsed from its name."""
+    file_path, filename, (map_name, strategy, seed) = candidate
+    try:
+        data = load_result_metrics(file_path)
+        
+        # Add metadata
+        data['map'] = map_name
+        data['strategy'] = strategy
+        data['seed'] = seed
+        data['filename'] = filename
+        
+        return data
+        
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return None
 
 def aggregate_results(results_dir="results/raw", output_dir="results/agg"):
     """Aggregate all experiment results into a summary CSV."""
@@ -14,51 +63,63 @@ def aggregate_results(results_dir="results/raw", output_dir="results/agg"):
     # Create output directory
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
-    # Find all result files
-    result_files = glob.glob(f"{results_dir}/*.json")
-    print(f"Found {len(result_files)} result files")
+    # Find result files named "<map>_<strategy>_<seed>_<ts>.json"; anything
+    # else (partial runs, checkpoints) is skipped without being opened. Runs
+    # that also wrote a one-line "<id>.jsonl" metrics summary are read from it.
+    raw_files = {}
+    summary_names = set()
+    skipped = 0
+    if os.path.isdir(results_dir):
+        for entry in os.scandir(results_dir):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if entry.name.endswith('.jsonl'):
+                summary_names.add(entry.name[:-6])
+            elif entry.name.endswith('.json'):
+                raw_files[entry.name[:-5]] = entry.path
+    
+    summary_files = []
+    result_files = []
+    for filename, path in raw_files.items():
+        match = _FN_RE.match(filename)
+        if not match:
+            skipped += 1
+        elif filename in summary_names:
+            summary_files.append((path[:-5] + '.jsonl', filename, match.groups()))
+        else:
+            result_files.append((path, filename, match.groups()))
+    print(f"Found {len(summary_files) + len(result_files)} result files")
+    if skipped:
+        print(f"Skipped {skipped} JSON files not matching <map>_<strategy>_<seed>")
     
-    results = []
+    frames = []
     
-    for file_path in result_files:
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
-            # Extract filename info
-            filename = Path(file_path).stem
-            parts = filename.split('_')
-            
-            # Parse strategy and map from filename
-            if len(parts) >= 3:
-                map_name = parts[0] + "_" + parts[1]  # map_small, map_medium, map_hard
-                strategy = parts[2]
-                seed = parts[3] if len(parts) > 3 else "unknown"
-            else:
-                map_name = "unknown"
-                strategy = "unknown"
-                seed = "unknown"
-            
-            # Add metadata
-            data['map'] = map_name
-            data['strategy'] = strategy
-            data['seed'] = seed
-            data['filename'] = filename
-            
-            results.append(data)
-            
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            continue
+    if summary_files:
+        # One pandas C-parser pass over all summaries concatenated as a single stream
+        chunks = []
+        for path, _, _ in summary_files:
+            with open(path, 'rb') as f:
+                chunks.append(f.read())
+        summary_df = pd.read_json(io.BytesIO(b"".join(chunks)), lines=True,
+                                  convert_dates=False, keep_default_dates=False)
+        summary_df['map'], summary_df['strategy'], summary_df['seed'] = zip(
+            *(groups for _, _, groups in summary_files))
+        summary_df['filename'] = [filename for _, filename, _ in summary_files]
+        frames.append(summary_df)
     
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        results = [data for data in executor.map(_load_one, result_files) if data is not None]
     if results:
+        frames.append(pd.DataFrame(results))
+    
+    if frames:
         # Create DataFrame
-        df = pd.DataFrame(results)
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
         
         # Save aggregated results
         output_file = Path(output_dir) / "summary.csv"
         df.to_csv(output_file, index=False)
-        print(f"✅ Aggregated {len(results)} results to {output_file}")
+        print(f"✅ Aggregated {len(df)} results to {output_file}")
         
         # Show summary
         print(f"\n📊 Results Summary:")
@@ -4,12 +4,25 @@ import sys
 import json
 import time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from datetime import datetime
-import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_LOGS_ROOT = Path("logs")
+
+def _dumps(obj, pretty=False):
+    """Serialize obj to JSON bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, indent=2 if pretty else None).encode()
 
 def run_experiment(map_path, strategy, seed, max_ticks=300):
     """
@@ -26,8 +39,10 @@ def run_experiment(map_path, strategy, seed, max_ticks=300):
     """
     
     # Import here to avoid circular imports
+    import yaml
     from env.world import CrisisModel
-    from reasoning.planner import make_plan
+    from reasoning.planner import begin_episode, make_plan
+    from reasoning.reflexion import flush_rules
     
     # Load map configuration
     with open(map_path, 'r') as f:
@@ -43,7 +58,9 @@ def run_experiment(map_path, strategy, seed, max_ticks=300):
     )
     
     # Run simulation
+    begin_episode(Path(map_path).stem, seed)
     transcript = []
+    transcript_json = []  # (context, plan) serialized once for the log writer
     start_time = time.time()
     
     for tick in range(max_ticks):
@@ -73,9 +90,10 @@ def run_experiment(map_path, strategy, seed, max_ticks=300):
             "tick": tick,
             "context": state,
             "plan": plan,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": time.time()  # epoch seconds; save_results writes it as ISO
         }
         transcript.append(tick_log)
+        transcript_json.append((_dumps(state).decode(), _dumps(plan).decode()))
         
         # Step the model
         model.step()
@@ -86,11 +104,15 @@ def run_experiment(map_path, strategy, seed, max_ticks=300):
             break
     
     end_time = time.time()
+    map_name = Path(map_path).stem
+    
+    # Persist buffered Reflexion memory now; atexit does not run in workers
+    flush_rules()
     
     # Collect final metrics
     results = {
-        "experiment_id": f"{Path(map_path).stem}_{strategy}_{seed}_{int(time.time())}",
-        "map": Path(map_path).stem,
+        "experiment_id": f"{map_name}_{strategy}_{seed}_{int(time.time())}",
+        "map": map_name,
         "strategy": strategy,
         "seed": seed,
         "ticks": len(transcript),
@@ -105,60 +127,74 @@ def run_experiment(map_path, strategy, seed, max_ticks=300):
         "invalid_json": model.invalid_json,
         "replans": model.replans,
         "hospital_overflow_events": model.hospital_overflow_events,
-        "transcript": transcript
+        "transcript": transcript,
+        "_transcript_json": transcript_json
     }
     
     return results
 
-def save_results(results, output_dir="results"):
+def _tick_log_lines(tick_num, context_json, plan_json):
+    """Render one tick as system/user/assistant JSONL lines from pre-serialized fragments."""
+    # Only the message contents are escaped here; the envelopes are fixed bytes
+    return (
+        b'{"role":"system","content":' + _dumps(f"Crisis response planning for tick {tick_num}") + b'}\n'
+        + b'{"role":"user","content":' + _dumps("Current crisis situation: " + context_json) + b'}\n'
+        + b'{"role":"assistant","content":' + _dumps("FINAL_JSON: " + plan_json) + b'}\n'
+    )
+
+def save_results(results, output_dir="results", per_tick_logs=False, pretty=False, raw_dir=None):
     """
     Save experiment results to the specified directory.
     
     Args:
         results: Experiment results dictionary
         output_dir: Directory to save results in
+        per_tick_logs: Also write one tickNNN.jsonl file per tick (debugging)
+        pretty: Indent the raw results JSON for human reading
+        raw_dir: Existing raw results directory; overrides output_dir/raw
     """
     
     # Create output directories
-    raw_dir = Path(output_dir) / "raw"
-    raw_dir.mkdir(parents=True, exist_ok=True)
+    if raw_dir is None:
+        raw_dir = Path(output_dir) / "raw"
+        raw_dir.mkdir(parents=True, exist_ok=True)
     
-    # Save raw results
+    # Save raw results; tick timestamps are formatted once, here, as ISO strings
     raw_file = raw_dir / f"{results['experiment_id']}.json"
-    with open(raw_file, 'w') as f:
-        json.dump(results, f, indent=2)
-    
-    # Save transcript logs
-    logs_dir = Path("logs") / f"strategy={results['strategy']}" / f"run={results['experiment_id']}"
+    raw = {k: v for k, v in results.items() if not k.startswith('_')}
+    raw['transcript'] = [
+        {**t, "timestamp": datetime.fromtimestamp(t['timestamp']).isoformat()} for t in results['transcript']
+    ]
+    with open(raw_file, 'wb') as f:
+        f.write(_dumps(raw, pretty=pretty))
+    
+    # One-line metrics summary next to the raw file, for fast aggregation
+    summary = {k: v for k, v in results.items() if k != 'transcript' and not k.startswith('_')}
+    with open(raw_dir / f"{results['experiment_id']}.jsonl", 'wb') as f:
+        f.write(_dumps(summary) + b"\n")
+    
+    # Save transcript logs as a single JSONL file per run
+    logs_dir = _LOGS_ROOT / f"strategy={results['strategy']}" / f"run={results['experiment_id']}"
     logs_dir.mkdir(parents=True, exist_ok=True)
+    transcript_file = logs_dir / "transcript.jsonl"
     
-    for tick_data in results['transcript']:
-        tick_num = tick_data['tick']
-        tick_file = logs_dir / f"tick{tick_num:03d}.jsonl"
-        
-        with open(tick_file, 'w') as f:
-            # Write system prompt
-            f.write(json.dumps({
-                "role": "system",
-                "content": f"Crisis response planning for tick {tick_num}"
-            }) + "\n")
-            
-            # Write context
-            f.write(json.dumps({
-                "role": "user",
-                "content": f"Current crisis situation: {json.dumps(tick_data['context'])}"
-            }) + "\n")
+    transcript_json = results.get('_transcript_json') or [
+        (_dumps(t['context']).decode(), _dumps(t['plan']).decode()) for t in results['transcript']
+    ]
+    
+    with open(transcript_file, 'wb', buffering=1 << 20) as f:
+        for tick_data, (context_json, plan_json) in zip(results['transcript'], transcript_json):
+            lines = _tick_log_lines(tick_data['tick'], context_json, plan_json)
+            f.write(lines)
             
-            # Write plan
-            f.write(json.dumps({
-                "role": "assistant",
-                "content": f"FINAL_JSON: {json.dumps(tick_data['plan'])}"
-            }) + "\n")
+            if per_tick_logs:
+                with open(logs_dir / f"tick{tick_data['tick']:03d}.jsonl", 'wb') as tick_file:
+                    tick_file.write(lines)
     
     print(f"Saved results to {raw_file}")
     print(f"Saved logs to {logs_dir}")
 
-def run_experiment_batch(maps, strategies, seeds, max_ticks=300):
+def run_experiment_batch(maps, strategies, seeds, max_ticks=300, per_tick_logs=False, pretty=False):
     """
     Run a batch of experiments.
     
@@ -167,10 +203,17 @@ def run_experiment_batch(maps, strategies, seeds, max_ticks=300):
         strategies: List of strategy names
         seeds: List of random seeds
         max_ticks: Maximum ticks per experiment
+        per_tick_logs: Also write per-tick log files (see save_results)
+        pretty: Indent raw results JSON (see save_results)
     """
     
     all_results = []
+    raw_dir = Path("results") / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
     
+    # Seeds run one after another: the planners share module-level state
+    # (plan and critique caches, Reflexion memory), so concurrent seeds
+    # would not be reproducible
     for map_path in maps:
         for strategy in strategies:
             for seed in seeds:
@@ -178,7 +221,7 @@ def run_experiment_batch(maps, strategies, seeds, max_ticks=300):
                 
                 try:
                     results = run_experiment(map_path, strategy, seed, max_ticks)
-                    save_results(results)
+                    save_results(results, per_tick_logs=per_tick_logs, pretty=pretty, raw_dir=raw_dir)
                     all_results.append(results)
                     
                     # Print summary
@@ -199,20 +242,19 @@ def aggregate_results(results_dir="results"):
     """
     
     import pandas as pd
+    from eval.aggregate_results import load_result_metrics
     
     raw_dir = Path(results_dir) / "raw"
     agg_dir = Path(results_dir) / "agg"
     agg_dir.mkdir(parents=True, exist_ok=True)
     
     # Load all results
-    all_results = []
-    for json_file in raw_dir.glob("*.json"):
-        with open(json_file, 'r') as f:
-            result = json.load(f)
-            # Remove transcript to keep CSV manageable
-            if 'transcript' in result:
-                del result['transcript']
-            all_results.append(result)
+    result_files = [
+        entry.path for entry in os.scandir(raw_dir)
+        if entry.name.endswith('.json') and entry.is_file(follow_symlinks=False)
+    ] if os.path.isdir(raw_dir) else []
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        all_results = list(executor.map(load_result_metrics, result_files))
     
     if not all_results:
         print("No results found to aggregate")
@@ -243,13 +285,22 @@ def aggregate_results(results_dir="results"):
     return df
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run the CrisisSim experiment batch")
+    parser.add_argument("--per-tick-logs", action="store_true",
+                        help="Also write one tickNNN.jsonl log file per tick (debugging)")
+    parser.add_argument("--pretty", action="store_true",
+                        help="Indent raw results JSON for human reading")
+    args = parser.parse_args()
+    
     # Example usage - REMOVED 'cot' STRATEGY
     maps = ["configs/map_small.yaml", "configs/map_medium.yaml", "configs/map_hard.yaml"]
     strategies = ["react", "reflexion", "plan_execute"]  # Removed 'cot'
     seeds = [42, 123, 456, 789, 999]
     
     print("Starting experiment batch...")
-    results = run_experiment_batch(maps, strategies, seeds)
+    results = run_experiment_batch(maps, strategies, seeds, per_tick_logs=args.per_tick_logs, pretty=args.pretty)
     
     print("\nAggregating results...")
     aggregate_results()
@@ -6,20 +6,22 @@ from pathlib import Path
 # Add parent directory to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 
-def create_required_plots(results_dir="results", plots_dir="results/plots"):
+def create_required_plots(results_dir="results", plots_dir="results/plots", dpi=150):
     """
     Create all required plots from the experiment results.
     
     Args:
         results_dir: Directory containing results
         plots_dir: Directory to save plots
+        dpi: Output resolution; 150 for drafts, 300 for publication figures
     """
     
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     # Create plots directory
     plots_path = Path(plots_dir)
     plots_path.mkdir(parents=True, exist_ok=True)
@@ -37,32 +39,32 @@ def create_required_plots(results_dir="results", plots_dir="results/plots"):
     sns.set_palette("husl")
     
     # 1. Bar plot: rescued and deaths by strategy × map
-    create_strategy_map_comparison(df, plots_path)
+    create_strategy_map_comparison(df, plots_path, dpi=dpi)
     
     # 2. Line plot: cumulative rescued over ticks
-    create_cumulative_rescue_plot(df, plots_path)
+    create_cumulative_rescue_plot(df, plots_path, dpi=dpi)
     
     # 3. Box plot: average rescue time per strategy
-    create_rescue_time_boxplot(df, plots_path)
+    create_rescue_time_boxplot(df, plots_path, dpi=dpi)
     
     # 4. Additional useful plots
-    create_resource_efficiency_plot(df, plots_path)
-    create_success_rate_plot(df, plots_path)
+    create_resource_efficiency_plot(df, plots_path, dpi=dpi)
+    create_success_rate_plot(df, plots_path, dpi=dpi)
     
     print(f"All plots saved to {plots_path}")
 
-def create_strategy_map_comparison(df, plots_path):
+def create_strategy_map_comparison(df, plots_path, dpi=150):
     """Create bar plot comparing rescued and deaths by strategy and map."""
     
+    import matplotlib.pyplot as plt
+    
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
     
+    # Per map × strategy means for both panels in a single pass
+    means = df.groupby(['map', 'strategy'])[['rescued', 'deaths']].mean()
+    
     # Rescued survivors
-    pivot_rescued = df.pivot_table(
-        values='rescued', 
-        index='map', 
-        columns='strategy', 
-        aggfunc='mean'
-    )
+    pivot_rescued = means['rescued'].unstack('strategy')
     
     pivot_rescued.plot(kind='bar', ax=ax1, color=['#2ecc71', '#3498db', '#e74c3c', '#f39c12'])
     ax1.set_title('Average Survivors Rescued by Strategy and Map', fontsize=14, fontweight='bold')
@@ -72,12 +74,7 @@ def create_strategy_map_comparison(df, plots_path):
     ax1.tick_params(axis='x', rotation=45)
     
     # Deaths
-    pivot_deaths = df.pivot_table(
-        values='deaths', 
-        index='map', 
-        columns='strategy', 
-        aggfunc='mean'
-    )
+    pivot_deaths = means['deaths'].unstack('strategy')
     
     pivot_deaths.plot(kind='bar', ax=ax2, color=['#2ecc71', '#3498db', '#e74c3c', '#f39c12'])
     ax2.set_title('Average Deaths by Strategy and Map', fontsize=14, fontweight='bold')
@@ -87,35 +84,36 @@ def create_strategy_map_comparison(df, plots_path):
     ax2.tick_params(axis='x', rotation=45)
     
     plt.tight_layout()
-    plt.savefig(plots_path / 'strategy_map_comparison.png', dpi=300, bbox_inches='tight')
+    plt.savefig(plots_path / 'strategy_map_comparison.png', dpi=dpi)
     plt.close()
 
-def create_cumulative_rescue_plot(df, plots_path):
+def create_cumulative_rescue_plot(df, plots_path, dpi=150):
     """Create line plot showing cumulative rescues over time."""
     
+    import matplotlib.pyplot as plt
+    
     plt.figure(figsize=(12, 8))
     
-    # Group by strategy and calculate cumulative rescues
+    # Average rescues over runs lasting at least each tick interval
+    tick_intervals = np.array([25, 50, 75, 100, 150, 200, 250, 300])
+    ticks = df['ticks'].to_numpy()
+    rescued = df['rescued'].to_numpy(dtype=float)
+    strategies = df['strategy'].to_numpy()
+    
     for strategy in df['strategy'].unique():
-        strategy_data = df[df['strategy'] == strategy]
+        mask = strategies == strategy
+        order = np.argsort(ticks[mask], kind='stable')
+        sorted_ticks = ticks[mask][order]
         
-        # Calculate average rescues at different tick intervals
-        tick_intervals = [25, 50, 75, 100, 150, 200, 250, 300]
-        avg_rescues = []
+        # Suffix sums over runs sorted by length give every interval's mean at once
+        suffix_sums = np.append(np.cumsum(rescued[mask][order][::-1])[::-1], 0.0)
+        first = np.searchsorted(sorted_ticks, tick_intervals, side='left')
+        counts = len(sorted_ticks) - first
+        valid = counts > 0
         
-        for max_ticks in tick_intervals:
-            # Filter data where experiment ran at least this long
-            valid_data = strategy_data[strategy_data['ticks'] >= max_ticks]
-            if len(valid_data) > 0:
-                avg_rescues.append(valid_data['rescued'].mean())
-            else:
-                avg_rescues.append(np.nan)
-        
-        # Plot with error bars
-        valid_indices = [i for i, x in enumerate(avg_rescues) if not np.isnan(x)]
-        if valid_indices:
-            plt.plot([tick_intervals[i] for i in valid_indices], 
-                    [avg_rescues[i] for i in valid_indices], 
+        if valid.any():
+            plt.plot(tick_intervals[valid], 
+                    suffix_sums[first[valid]] / counts[valid], 
                     marker='o', linewidth=2, label=f'{strategy}', markersize=8)
     
     plt.xlabel('Simulation Ticks', fontsize=12)
@@ -126,12 +124,15 @@ def create_cumulative_rescue_plot(df, plots_path):
     plt.xlim(0, 300)
     
     plt.tight_layout()
-    plt.savefig(plots_path / 'cumulative_rescue_over_time.png', dpi=300, bbox_inches='tight')
+    plt.savefig(plots_path / 'cumulative_rescue_over_time.png', dpi=dpi)
     plt.close()
 
-def create_rescue_time_boxplot(df, plots_path):
+def create_rescue_time_boxplot(df, plots_path, dpi=150):
     """Create box plot showing rescue time distribution by strategy."""
     
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     plt.figure(figsize=(10, 6))
     
     # Filter out invalid rescue times
@@ -150,60 +151,68 @@ def create_rescue_time_boxplot(df, plots_path):
                      color='black', alpha=0.5, size=4)
         
         plt.tight_layout()
-        plt.savefig(plots_path / 'rescue_time_distribution.png', dpi=300, bbox_inches='tight')
+        plt.savefig(plots_path / 'rescue_time_distribution.png', dpi=dpi)
     else:
         print("No valid rescue time data found for box plot")
     
     plt.close()
 
-def create_resource_efficiency_plot(df, plots_path):
+def create_resource_efficiency_plot(df, plots_path, dpi=150):
     """Create plot showing resource efficiency metrics."""
     
+    import matplotlib.pyplot as plt
+    
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
     
+    # Per map × strategy means for all four panels in a single pass
+    means = df.groupby(['map', 'strategy'])[
+        ['fires_extinguished', 'roads_cleared', 'energy_used', 'invalid_json']
+    ].mean()
+    
     # Fires extinguished
-    pivot_fires = df.pivot_table(values='fires_extinguished', index='map', columns='strategy', aggfunc='mean')
+    pivot_fires = means['fires_extinguished'].unstack('strategy')
     pivot_fires.plot(kind='bar', ax=axes[0,0], color=['#2ecc71', '#3498db', '#e74c3c', '#f39c12'])
     axes[0,0].set_title('Fires Extinguished', fontweight='bold')
     axes[0,0].set_ylabel('Count')
     axes[0,0].tick_params(axis='x', rotation=45)
     
     # Roads cleared
-    pivot_roads = df.pivot_table(values='roads_cleared', index='map', columns='strategy', aggfunc='mean')
+    pivot_roads = means['roads_cleared'].unstack('strategy')
     pivot_roads.plot(kind='bar', ax=axes[0,1], color=['#2ecc71', '#3498db', '#e74c3c', '#f39c12'])
     axes[0,1].set_title('Roads Cleared', fontweight='bold')
     axes[0,1].set_ylabel('Count')
     axes[0,1].tick_params(axis='x', rotation=45)
     
     # Energy used
-    pivot_energy = df.pivot_table(values='energy_used', index='map', columns='strategy', aggfunc='mean')
+    pivot_energy = means['energy_used'].unstack('strategy')
     pivot_energy.plot(kind='bar', ax=axes[1,0], color=['#2ecc71', '#3498db', '#e74c3c', '#f39c12'])
     axes[1,0].set_title('Energy Used', fontweight='bold')
     axes[1,0].set_ylabel('Count')
     axes[1,0].tick_params(axis='x', rotation=45)
     
     # Invalid JSON attempts
-    pivot_invalid = df.pivot_table(values='invalid_json', index='map', columns='strategy', aggfunc='mean')
+    pivot_invalid = means['invalid_json'].unstack('strategy')
     pivot_invalid.plot(kind='bar', ax=axes[1,1], color=['#2ecc71', '#3498db', '#e74c3c', '#f39c12'])
     axes[1,1].set_title('Invalid JSON Attempts', fontweight='bold')
     axes[1,1].set_ylabel('Count')
     axes[1,1].tick_params(axis='x', rotation=45)
     
     plt.tight_layout()
-    plt.savefig(plots_path / 'resource_efficiency_metrics.png', dpi=300, bbox_inches='tight')
+    plt.savefig(plots_path / 'resource_efficiency_metrics.png', dpi=dpi)
     plt.close()
 
-def create_success_rate_plot(df, plots_path):
+def create_success_rate_plot(df, plots_path, dpi=150):
     """Create plot showing success rates and failure metrics."""
     
-    # Calculate success rate (rescued / (rescued + deaths))
-    df['success_rate'] = df['rescued'] / (df['rescued'] + df['deaths'])
-    df['success_rate'] = df['success_rate'].fillna(0)
+    import matplotlib.pyplot as plt
+    
+    # Per-run success rate (rescued / (rescued + deaths)), without touching df
+    success_rate = (df['rescued'] / (df['rescued'] + df['deaths'])).fillna(0)
     
     plt.figure(figsize=(12, 6))
     
     # Success rate by strategy
-    success_by_strategy = df.groupby('strategy')['success_rate'].agg(['mean', 'std']).reset_index()
+    success_by_strategy = success_rate.groupby(df['strategy']).agg(['mean', 'std']).reset_index()
     
     x_pos = np.arange(len(success_by_strategy))
     plt.bar(x_pos, success_by_strategy['mean'], 
@@ -224,10 +233,10 @@ def create_success_rate_plot(df, plots_path):
     
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(plots_path / 'success_rate_by_strategy.png', dpi=300, bbox_inches='tight')
+    plt.savefig(plots_path / 'success_rate_by_strategy.png', dpi=dpi)
     plt.close()
 
 if __name__ == "__main__":
-    # Create all required plots
+    # Create all required plots (pass dpi=300 for publication figures)
     create_required_plots()
     print("All plots generated successfully!")
@@ -10,18 +10,26 @@ import json
 import sys
 import io
 import threading
-import websockets
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Fix encoding issues
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 from env.world import CrisisModel, load_map_config
-from reasoning.planner import make_plan
+from reasoning.planner import begin_episode, make_plan
+from reasoning.reflexion import flush_rules
 
 # WebSocket state push
 _clients = set()
 _ws_server = None
+_ws_loop = None
+_state_q = None  # asyncio.Queue owned by the WebSocket loop
 
 async def ws_handler(websocket):
     """Handle incoming WebSocket connections."""
@@ -32,24 +40,46 @@ async def ws_handler(websocket):
     finally:
         _clients.remove(websocket)
 
-async def push_state(state_json: str):
-    """Send state JSON to all connected clients."""
+def push_state(state_json: str):
+    """Send state JSON to all connected clients (frames once, never blocks)."""
     if _clients:
-        await asyncio.gather(
-            *[client.send(state_json) for client in _clients],
-            return_exceptions=True
-        )
+        from websockets import broadcast
+        broadcast(_clients, state_json)
+
+def _enqueue_latest(payload: str):
+    """Runs on the WebSocket loop: queue payload, dropping the oldest when full."""
+    if _state_q.full():
+        _state_q.get_nowait()
+    _state_q.put_nowait(payload)
+
+def publish_state(payload: str):
+    """Hand a state payload to the WebSocket thread without blocking the sim."""
+    if _ws_loop is None:
+        return  # Server not started (yet)
+    try:
+        _ws_loop.call_soon_threadsafe(_enqueue_latest, payload)
+    except RuntimeError:
+        pass  # Loop already closed
 
 def start_ws_server():
     """Start the WebSocket server at ws://127.0.0.1:8000."""
     global _ws_server
+    import websockets
     
     async def run_server():
-        global _ws_server
+        global _ws_server, _ws_loop, _state_q
+        _state_q = asyncio.Queue(maxsize=4)
         _ws_server = await websockets.serve(ws_handler, "127.0.0.1", 8000)
+        _ws_loop = asyncio.get_running_loop()
         print("WebSocket server running at ws://127.0.0.1:8000")
         print("Open index.html in a browser to view live simulation")
-        await asyncio.Future()  # run forever
+        
+        # Forward states from the simulation thread. Waiting on the loop's
+        # own queue parks no worker thread, so the daemon thread never keeps
+        # the interpreter from exiting once the episode is over.
+        while True:
+            payload = await _state_q.get()
+            push_state(payload)
 
     # Run WebSocket server in a separate thread
     def run_in_thread():
@@ -61,6 +91,12 @@ def start_ws_server():
     thread.start()
     return thread
 
+def next_id(self):
+    if not hasattr(self, '_next_id'):
+        self._next_id = 0
+    self._next_id += 1
+    return self._next_id
+
 def run_episode(map_path, seed=42, ticks=300, provider="mock", strategy="react"):
     """Run a single simulation episode."""
     
@@ -85,19 +121,11 @@ def run_episode(map_path, seed=42, ticks=300, provider="mock", strategy="react")
     print(f"Initial fires: {len(cfg.get('initial_fires', []))}")
 
     tick_count = 0
+    begin_episode(Path(map_path).stem, seed)
+    ctx = model.summarize_state()
 
-def next_id(self):
-    if not hasattr(self, '_next_id'):
-        self._next_id = 0
-    self._next_id += 1
-    return self._next_id
-    
-    # Create a separate event loop for state pushing
-    push_loop = asyncio.new_event_loop()
-    
     while model.running and tick_count < ticks:
         # Planning step
-        ctx = model.summarize_state()
         try:
             # FIX: Remove the provider parameter from make_plan call
             plan = make_plan(ctx, strategy=strategy)
@@ -110,11 +138,14 @@ def next_id(self):
         model.step()
         tick_count += 1
 
+        # Summarize once per tick: pushed now and planned on next tick
+        ctx = model.summarize_state()
+
         # Push state to browser
         try:
             state_data = {
                 "time": model.time,
-                **model.summarize_state(),
+                **ctx,
                 "metrics": {
                     "rescued": model.rescued,
                     "deaths": model.deaths,
@@ -123,18 +154,21 @@ def next_id(self):
                     "energy_used": model.energy_used
                 }
             }
-            payload = json.dumps(state_data)
+            # Text frames: the browser client JSON.parse()s event.data
+            if orjson is not None:
+                payload = orjson.dumps(state_data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+            else:
+                payload = json.dumps(state_data)
             
-            # Push state using the dedicated loop
-            asyncio.set_event_loop(push_loop)
-            push_loop.run_until_complete(push_state(payload))
+            # Hand off to the WebSocket thread without blocking the sim
+            publish_state(payload)
             
         except Exception as e:
             print(f"Error pushing state: {e}")
 
         # Progress log
         if tick_count % 50 == 0:
-            remaining = sum(1 for a in model.schedule.agents if a.__class__.__name__ == "Survivor")
+            remaining = model.total_survivors - model.rescued - model.deaths if model.total_survivors else '?'
             print(f"Tick {tick_count}: {model.rescued} rescued, {model.deaths} deaths, {remaining} survivors remaining")
 
         # Stop early if all survivors resolved
@@ -142,8 +176,8 @@ def next_id(self):
             print("All survivors resolved!")
             break
 
-    # Clean up the push loop
-    push_loop.close()
+    # Persist buffered Reflexion memory at the end of every episode
+    flush_rules()
 
     # Final results
     print(f"Simulation completed in {tick_count} ticks")
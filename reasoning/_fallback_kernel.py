@@ -0,0 +1,38 @@
+"""
+Closest-survivor kernel for the fallback planner.
+
+With numba installed the search is a compiled loop that keeps the running
+minimum in registers (O(A) memory); otherwise it falls back to the NumPy
+(A, S) distance matrix. The loop is deliberately serial: the matrix is tiny,
+and a parallel kernel aborts the process when planner threads call it
+concurrently under numba's default workqueue threading layer.
+"""
+
+import numpy as np
+
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+if nb is not None:
+    @nb.njit(cache=True, fastmath=True)
+    def closest_survivor(agent_positions, survivor_positions):
+        """Index of the Manhattan-closest survivor for each agent (first on ties)."""
+        out = np.empty(agent_positions.shape[0], dtype=np.int32)
+        for i in range(agent_positions.shape[0]):
+            best = 0
+            best_distance = 2 ** 30
+            for j in range(survivor_positions.shape[0]):
+                distance = (abs(agent_positions[i, 0] - survivor_positions[j, 0])
+                            + abs(agent_positions[i, 1] - survivor_positions[j, 1]))
+                if distance < best_distance:
+                    best_distance = distance
+                    best = j
+            out[i] = best
+        return out
+else:
+    def closest_survivor(agent_positions, survivor_positions):
+        """Index of the Manhattan-closest survivor for each agent (first on ties)."""
+        distances = np.abs(agent_positions[:, None, :] - survivor_positions[None, :, :]).sum(axis=-1)
+        return distances.argmin(axis=1)
@@ -0,0 +1,100 @@
+# reasoning/_format.py
+"""
+Prompt formatters shared by the planning strategies.
+
+Single source for the agent, survivor, hospital and obstacle sections of
+every planner prompt.
+"""
+
+import functools
+from bisect import bisect_right
+
+import numpy as np
+
+# Optional agent fields, in the order they appear in the prompt
+_AGENT_LABELS = ("battery", "water", "tools")
+
+# Urgency scale as (thresholds, labels): below 30 critical, below 100 urgent,
+# else stable. Planners with their own priorities pass a different scale.
+URGENCY_SCALE = ((30, 100), ("🚨 CRITICAL", "⚠️ URGENT", "✅ STABLE"))
+
+# Above this many survivors the deadline sort is done by NumPy
+_ARGSORT_MIN = 32
+
+@functools.lru_cache(maxsize=1024)
+def _agent_line(kind, agent_id, pos, battery, water, tools, carrying):
+    """One agent line; agents that did not change since the last tick hit the cache."""
+    line = f"- {kind} (ID: {agent_id}) at [{pos[0]}, {pos[1]}]"
+    line += "".join(f", {label}: {value}" for label, value in zip(_AGENT_LABELS, (battery, water, tools)) if value is not None)
+    return line + ", carrying survivor" if carrying else line
+
+def format_agents(agents):
+    """Format agents list for the prompt"""
+    if not agents:
+        return "None"
+    
+    return "\n".join(
+        _agent_line(a['kind'], a['id'], tuple(a['pos']), a.get('battery'), a.get('water'), a.get('tools'), bool(a.get('carrying')))
+        for a in agents
+    )
+
+def _sorted_by_deadline(survivors):
+    """Survivors sorted most urgent first."""
+    if len(survivors) > _ARGSORT_MIN:
+        deadlines = np.fromiter((s.get('deadline', 999) for s in survivors), dtype=np.float64, count=len(survivors))
+        # Stable, so ties keep list order exactly as sorted() would
+        return [survivors[i] for i in np.argsort(deadlines, kind='stable')]
+    return sorted(survivors, key=lambda s: s.get('deadline', 999))
+
+def _urgency(deadline, scale):
+    """Urgency label for a deadline, or '' when the deadline is unknown."""
+    if not isinstance(deadline, (int, float)):
+        return ""
+    thresholds, labels = scale
+    return f" ({labels[bisect_right(thresholds, deadline)]})"
+
+def format_survivors(survivors, *, urgency=False):
+    """
+    Format survivors list for the prompt.
+    
+    With urgency, survivors are listed most urgent first and tagged with an
+    urgency indicator; pass True for URGENCY_SCALE or a (thresholds, labels)
+    pair of your own.
+    """
+    if not survivors:
+        return "None"
+    
+    if urgency:
+        scale = URGENCY_SCALE if urgency is True else urgency
+        return "\n".join(
+            f"- Survivor {s['id']} at {s['pos']}, deadline: {s.get('deadline', 'unknown')}{_urgency(s.get('deadline'), scale)}"
+            for s in _sorted_by_deadline(survivors)
+        )
+    return "\n".join(
+        f"- Survivor {s['id']} at {s['pos']}, deadline: {s.get('deadline', 'unknown')}" for s in survivors
+    )
+
+def format_hospitals(hospitals):
+    """Format hospitals list for the prompt (context entries carry 'queue_len'; see Hospital.to_context)"""
+    if not hospitals:
+        return "None"
+    
+    return "\n".join(
+        f"- Hospital at {h['pos']}, capacity: {h.get('capacity', 'unknown')}, "
+        f"patients: {h.get('patients_count', 0)}, queue: {h.get('queue_len', h.get('queue_count', 0))}"
+        for h in hospitals
+    )
+
+def format_fires(fires):
+    """Format fires list for the prompt"""
+    if not fires:
+        return "None"
+    
+    return "\n".join(f"- Fire at {fire}" for fire in fires)
+
+def format_rubble(rubble):
+    """Format rubble list for the prompt"""
+    if not rubble:
+        return "None"
+    
+    return "\n".join(f"- Rubble at {rub}" for rub in rubble)
@@ -0,0 +1,99 @@
+# reasoning/_llm_async.py
+"""
+Async transport for the Groq and Gemini providers.
+
+A single event loop runs forever in a daemon thread and owns the async SDK
+clients, so concurrent requests from any thread share one connection pool
+(HTTP/2 multiplexed when the h2 package is installed) instead of each
+opening its own connection.
+"""
+
+import asyncio
+import functools
+import importlib.util
+import os
+import threading
+
+from . import llm_client
+
+# httpx speaks HTTP/2 only when the h2 package is installed
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+_MAX_CONNECTIONS = 32
+
+@functools.lru_cache(maxsize=1)
+def _get_loop():
+    """Event loop pinned to a background thread, started on first use."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="llm-async-loop", daemon=True).start()
+    return loop
+
+def run(coro):
+    """Run coro on the shared loop and block the calling thread for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+@functools.lru_cache(maxsize=1)
+def _get_async_groq():
+    """AsyncGroq client on a keep-alive httpx pool; must be created on the shared loop."""
+    import httpx
+    from groq import AsyncGroq
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY environment variable not set")
+    http_client = httpx.AsyncClient(
+        http2=_HTTP2,
+        limits=httpx.Limits(max_connections=_MAX_CONNECTIONS, max_keepalive_connections=_MAX_CONNECTIONS)
+    )
+    return AsyncGroq(api_key=api_key, http_client=http_client)
+
+async def _agroq_complete(prompt, temperature, system=None, header=None, strict_json=False):
+    """Async counterpart of llm_client._groq_complete."""
+    client = _get_async_groq()
+    stream = await client.chat.completions.create(
+        model=llm_client._GROQ_MODEL,
+        messages=llm_client._groq_messages(prompt, system, header),
+        temperature=temperature,
+        response_format={"type": "json_object"},
+        stream=True
+    )
+    scanner = llm_client._PlanStreamScanner()
+    try:
+        async for chunk in stream:
+            if scanner.feed(chunk.choices[0].delta.content or ""):
+                break
+    finally:
+        await stream.close()
+    return scanner.text()
+
+async def _agemini_complete(prompt, temperature, system=None, header=None, strict_json=False):
+    """Async counterpart of llm_client._gemini_complete."""
+    model = llm_client._get_gemini_model(llm_client._GEMINI_MODEL, temperature, system, strict_json)
+    response = await model.generate_content_async([header, prompt] if header else prompt, stream=True)
+    if not strict_json:
+        # Free text is read to the end; a later JSON object may revise the plan
+        return llm_client._clean_gemini_text("".join([chunk.text async for chunk in response]))
+    scanner = llm_client._PlanStreamScanner()
+    async for chunk in response:
+        if scanner.feed(chunk.text):
+            break
+    return llm_client._clean_gemini_text(scanner.text())
+
+_ACOMPLETE = {"groq": _agroq_complete, "gemini": _agemini_complete}
+
+async def acomplete(prompt, temperature=0.2, system=None, header=None, strict_json=False):
+    """Complete prompt with the configured provider; raises on any error."""
+    return await _ACOMPLETE[llm_client._PROVIDER](prompt, temperature, system, header, strict_json)
+
+def complete_many(prompts, temperature=0.2, system=None, header=None, strict_json=False):
+    """
+    Complete all prompts concurrently on the shared loop.
+    
+    Returns one entry per prompt, in order: the response text, or the
+    exception raised for that prompt.
+    """
+    async def gather():
+        return await asyncio.gather(
+            *(acomplete(prompt, temperature, system, header, strict_json) for prompt in prompts),
+            return_exceptions=True
+        )
+    return run(gather())
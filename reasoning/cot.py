@@ -1,28 +1,11 @@
 # reasoning/cot.py
 import json
-from .llm_client import llm_complete
+from string import Template
+from .llm_client import llm_complete, _extract_last_json_object
+from ._format import format_agents, format_survivors
 from .schema_validator import enforce_assignment_schema, create_schema_enforcement_prompt, create_fallback_plan
 
-def make_cot_plan(context, strategy: str = "cot", scratchpad: str = ""):
-    """
-    Entry point used by planner.make_plan(...):
-      returns dict with commands
-    """
-    return chain_of_thought_planning(context, scratchpad)
-
-def chain_of_thought_planning(context: dict, scratchpad: str = "") -> dict:
-    """
-    Chain-of-Thought reasoning framework for crisis response.
-    
-    This approach breaks down the planning into explicit reasoning steps:
-    1. Observe the current situation
-    2. Think through the problem step by step
-    3. Reason about priorities and constraints
-    4. Plan specific actions
-    5. Execute the plan
-    """
-    
-    system_prompt = """You are a crisis response coordinator using Chain-of-Thought reasoning. 
+_COT_SYSTEM = """You are a crisis response coordinator using Chain-of-Thought reasoning. 
 
 Your task is to think through the crisis situation step by step and generate a response plan.
 
@@ -65,20 +48,27 @@ IMPORTANT:
 - Coordinates must be within the grid bounds
 - End with ONLY the JSON, no text after it"""
 
-    user_prompt = f"""Current crisis situation:
+# Static prefix, built once and sent as the system message so it stays
+# byte-identical across calls (provider prompt caching keys on it)
+_SYSTEM_PROMPT = _COT_SYSTEM + "\n\n" + create_schema_enforcement_prompt()
+
+# Scenario header: fixed for a whole episode, sent as its own message after
+# the system prompt so the provider can cache it as part of the prefix
+_SCENARIO_TEMPLATE = Template("""Current crisis situation:
 
-Grid: {context.get('grid', {})}
-Depot: {context.get('depot', [])}
+Grid: $grid
+Depot: $depot""")
 
-Agents:
-{format_agents(context.get('agents', []))}
+# Volatile per-tick part; hospital queues change every tick so they live here
+_USER_PROMPT_TEMPLATE = Template("""Agents:
+$agents
 
-Hospitals: {context.get('hospitals', [])}
-Fires: {context.get('fires', [])}
-Rubble: {context.get('rubble', [])}
-Survivors: {format_survivors(context.get('survivors', []))}
+Hospitals: $hospitals
+Fires: $fires
+Rubble: $rubble
+Survivors: $survivors
 
-Previous actions: {scratchpad if scratchpad else 'None'}
+Previous actions: $scratchpad
 
 Now work through the Chain-of-Thought process:
 
@@ -86,14 +76,42 @@ STEP 1 - OBSERVE: What do I see in this crisis situation?
 STEP 2 - ANALYZE: What are the most urgent priorities?
 STEP 3 - REASON: What are my constraints and available resources?
 STEP 4 - PLAN: What should each agent do this turn?
-STEP 5 - EXECUTE: Convert to JSON commands"""
+STEP 5 - EXECUTE: Convert to JSON commands""")
+
+def make_cot_plan(context, strategy: str = "cot", scratchpad: str = ""):
+    """
+    Entry point used by planner.make_plan(...):
+      returns dict with commands
+    """
+    return chain_of_thought_planning(context, scratchpad)
 
-    # Add schema enforcement to prompt
-    schema_prompt = create_schema_enforcement_prompt()
-    full_prompt = system_prompt + "\n\n" + schema_prompt + "\n\n" + user_prompt
+def chain_of_thought_planning(context: dict, scratchpad: str = "") -> dict:
+    """
+    Chain-of-Thought reasoning framework for crisis response.
+    
+    This approach breaks down the planning into explicit reasoning steps:
+    1. Observe the current situation
+    2. Think through the problem step by step
+    3. Reason about priorities and constraints
+    4. Plan specific actions
+    5. Execute the plan
+    """
+    
+    scenario = _SCENARIO_TEMPLATE.substitute(
+        grid=context.get('grid', {}),
+        depot=context.get('depot', [])
+    )
+    user_prompt = _USER_PROMPT_TEMPLATE.substitute(
+        agents=format_agents(context.get('agents', [])),
+        hospitals=context.get('hospitals', []),
+        fires=context.get('fires', []),
+        rubble=context.get('rubble', []),
+        survivors=format_survivors(context.get('survivors', []), urgency=True),
+        scratchpad=scratchpad if scratchpad else 'None'
+    )
     
     try:
-        response = llm_complete(full_prompt, temperature=0.1)
+        response = llm_complete(user_prompt, temperature=0.1, system=_SYSTEM_PROMPT, header=scenario)
         
         # Use assignment schema validation
         plan, is_valid, error_msg = enforce_assignment_schema(response)
@@ -104,11 +122,9 @@ STEP 5 - EXECUTE: Convert to JSON commands"""
         else:
             print(f"❌ CoT: Invalid JSON schema: {error_msg}")
             # CoT often produces verbose output, try extracting just the JSON part
-            json_start = response.rfind('{')
-            json_end = response.rfind('}') + 1
+            json_only = _extract_last_json_object(response)
             
-            if json_start != -1 and json_end > json_start:
-                json_only = response[json_start:json_end]
+            if json_only:
                 retry_plan, retry_valid, retry_error = enforce_assignment_schema(json_only)
                 
                 if retry_valid and retry_plan:
@@ -121,39 +137,3 @@ STEP 5 - EXECUTE: Convert to JSON commands"""
     except Exception as e:
         print(f"Error in Chain-of-Thought planning: {e}")
         return create_fallback_plan()
-
-def format_agents(agents):
-    """Format agents list for the prompt"""
-    if not agents:
-        return "None"
-    
-    formatted = []
-    for agent in agents:
-        agent_str = f"- {agent['kind']} (ID: {agent['id']}) at {agent['pos']}"
-        if agent.get('battery') is not None:
-            agent_str += f", battery: {agent['battery']}"
-        if agent.get('water') is not None:
-            agent_str += f", water: {agent['water']}"
-        if agent.get('tools') is not None:
-            agent_str += f", tools: {agent['tools']}"
-        if agent.get('carrying'):
-            agent_str += ", carrying survivor"
-        formatted.append(agent_str)
-    
-    return "\n".join(formatted)
-
-def format_survivors(survivors):
-    """Format survivors list for the prompt with urgency indicators"""
-    if not survivors:
-        return "None"
-    
-    # Sort survivors by deadline (most urgent first)
-    sorted_survivors = sorted(survivors, key=lambda s: s.get('deadline', 999))
-    
-    formatted = []
-    for survivor in sorted_survivors:
-        deadline = survivor.get('deadline', 'unknown')
-        urgency = "🚨 CRITICAL" if deadline < 30 else "⚠️ URGENT" if deadline < 100 else "✅ STABLE"
-        formatted.append(f"- Survivor {survivor['id']} at {survivor['pos']}, deadline: {deadline} ({urgency})")
-    
-    return "\n".join(formatted)
@@ -0,0 +1,84 @@
+# reasoning/critique_cache.py
+"""
+Cache of Reflexion plan critiques.
+
+Critiques are generic advice about coordination and efficiency, so two
+ticks with the same coarse shape (agent, survivor and command counts, and
+how close the nearest deadline is) get the same critique instead of a
+second LLM call. Entries are evicted oldest-first and persisted to disk so
+they carry over between runs; like the Reflexion rules memory, writes are
+buffered and only reach the file on flush().
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class CritiqueCache:
+    """FIFO map from a situation bucket to a stored critique."""
+    
+    def __init__(self, path: str, maxsize: int = 128):
+        self.path = path
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+    
+    @staticmethod
+    def bucket_key(context: Dict[str, Any], plan: Dict[str, Any]) -> str:
+        survivors = context.get('survivors', [])
+        bucket = (
+            len(context.get('agents', [])),
+            len(survivors),
+            len(plan.get('commands', [])),
+            min((s.get('deadline', 999) for s in survivors), default=999) // 50
+        )
+        return hashlib.sha256(repr(bucket).encode()).hexdigest()
+    
+    def get(self, context: Dict[str, Any], plan: Dict[str, Any]) -> Optional[str]:
+        with self._lock:
+            return self._entries.get(self.bucket_key(context, plan))
+    
+    def put(self, context: Dict[str, Any], plan: Dict[str, Any], critique: str):
+        key = self.bucket_key(context, plan)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                self._entries.popitem(last=False)
+            self._entries[key] = critique
+            self._dirty = True
+    
+    def flush(self):
+        """Write the entries to disk if any changed since the last flush."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+    
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    self._entries.update(orjson.loads(f.read()) if orjson is not None else json.load(f))
+            except Exception:
+                pass
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def _save(self):
+        try:
+            with open(self.path, "wb") as f:
+                if orjson is not None:
+                    f.write(orjson.dumps(self._entries, option=orjson.OPT_INDENT_2))
+                else:
+                    f.write(json.dumps(self._entries, indent=2).encode())
+            self._dirty = False
+        except Exception as e:
+            print(f"Error saving critique cache: {e}")
@@ -2,8 +2,9 @@
 Fallback planner for testing when LLM is not available.
 """
 
-import json
-import random
+import numpy as np
+
+from ._fallback_kernel import closest_survivor
 
 def make_fallback_plan(context: dict) -> dict:
     """
@@ -18,51 +19,29 @@ def make_fallback_plan(context: dict) -> dict:
     if not survivors or not agents:
         return {"commands": []}
     
-    # For each agent, move toward the closest survivor
-    for agent in agents:
-        agent_id = agent['id']
-        agent_pos = agent['pos']
-        agent_kind = agent['kind']
-        
-        # Find closest survivor
-        closest_survivor = None
-        min_distance = float('inf')
-        
-        for survivor in survivors:
-            survivor_pos = survivor['pos']
-            distance = abs(agent_pos[0] - survivor_pos[0]) + abs(agent_pos[1] - survivor_pos[1])
-            
-            if distance < min_distance:
-                min_distance = distance
-                closest_survivor = survivor
-        
-        if closest_survivor:
-            target_pos = closest_survivor['pos']
-            
-            # Calculate next step toward target
-            dx = target_pos[0] - agent_pos[0]
-            dy = target_pos[1] - agent_pos[1]
-            
-            # Move in the direction with largest difference
-            if abs(dx) > abs(dy):
-                new_x = agent_pos[0] + (1 if dx > 0 else -1)
-                new_y = agent_pos[1]
-            else:
-                new_x = agent_pos[0]
-                new_y = agent_pos[1] + (1 if dy > 0 else -1)
-            
-            # Ensure within bounds
-            grid = context.get('grid', {})
-            width = grid.get('width', 20)
-            height = grid.get('height', 20)
-            
-            new_x = max(0, min(new_x, width - 1))
-            new_y = max(0, min(new_y, height - 1))
-            
-            commands.append({
-                "agent_id": agent_id,
-                "type": "move",
-                "to": [new_x, new_y]
-            })
+    # Closest survivor for every agent at once (Manhattan distance)
+    agent_positions = np.asarray([a['pos'] for a in agents], dtype=np.int32)
+    survivor_positions = np.asarray([s['pos'] for s in survivors], dtype=np.int32)
+    closest = closest_survivor(agent_positions, survivor_positions)
+    
+    # One step along the axis with the larger gap (y on ties), clipped to the
+    # grid. A y step with no y gap goes to y - 1, so an agent already on its
+    # survivor still steps off it, as the original per-agent loop did.
+    delta = survivor_positions[closest] - agent_positions
+    pick_x = np.abs(delta[:, 0]) > np.abs(delta[:, 1])
+    step = np.zeros_like(agent_positions)
+    step[pick_x, 0] = np.sign(delta[pick_x, 0])
+    step[~pick_x, 1] = np.where(delta[~pick_x, 1] > 0, 1, -1)
+    
+    grid = context.get('grid', {})
+    upper = np.array([grid.get('width', 20) - 1, grid.get('height', 20) - 1], dtype=np.int32)
+    new_positions = np.clip(agent_positions + step, 0, upper).tolist()
+    
+    for agent, new_pos in zip(agents, new_positions):
+        commands.append({
+            "agent_id": agent['id'],
+            "type": "move",
+            "to": new_pos
+        })
     
     return {"commands": commands}
@@ -1,146 +1,499 @@
 # reasoning/llm_client.py
 import os
 import json
+import atexit
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from dotenv import load_dotenv
 
+from .schema_validator import COMMANDS_RESPONSE_SCHEMA
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables from .env file
 load_dotenv()
 
-def llm_complete(prompt: str, model: str = None, temperature: float = 0.2) -> str:
-    """Legacy function for backward compatibility."""
-    return get_llm_response(prompt, temperature)
+# Provider is fixed for the process: mock, groq or gemini
+_PROVIDER = os.getenv("LLM_PROVIDER", "mock").lower()
 
-def get_llm_response(prompt: str, temperature: float = 0.2) -> str:
-    provider = os.getenv("LLM_PROVIDER", "mock").lower()
-    
-    # Set model name based on provider - using latest and strongest models
-    if provider == "groq":
-        model_name = "llama-3.3-70b-versatile"  # Latest Groq model
-    elif provider == "gemini":
-        model_name = "gemini-1.5-flash"  # Latest, fastest Gemini model
-        # Alternative: "gemini-1.5-pro" (more capable but slower)
-    else:
-        model_name = "mock"
+# Scenario (map, seed) of the running episode; scopes the on-disk cache
+_scenario = None
+
+def set_scenario(scenario):
+    """Tag on-disk cached responses with the running episode's scenario."""
+    global _scenario
+    _scenario = scenario
+
+# In-process response cache: (provider, system, prompt, temperature) -> response.
+# Only low-temperature calls are cached; sampling at higher temperatures is
+# supposed to vary between calls.
+_CACHE_MAX_TEMPERATURE = 0.2
+_CACHE_MAXSIZE = 1024
+_response_cache = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0}
+# Planner threads and the async transport thread share the cache
+_cache_lock = threading.Lock()
+
+def _cache_enabled(temperature: float) -> bool:
+    """Responses are cached unless CACHE_DISABLE is set or temperature is high."""
+    return temperature <= _CACHE_MAX_TEMPERATURE and not os.getenv("CACHE_DISABLE")
+
+def _cache_key(provider: str, prompt: str, temperature: float, system: str = None, header: str = None,
+               strict_json: bool = False) -> tuple:
+    """Hash the full request text; the temperature is bucketed to hundredths."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (provider, system or "", header or "", prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest(), round(temperature * 100), strict_json
+
+def _cache_lookup(key):
+    """Cached response for key (None key: caching off), counting hits and misses."""
+    if key is None:
+        return None
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        if cached is None:
+            _cache_stats["misses"] += 1
+            return None
+        _response_cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return cached
+
+def _cache_store(key, response: str):
+    """Remember response for key, evicting the least recently used entry."""
+    if key is None:
+        return
+    with _cache_lock:
+        _response_cache[key] = response
+        if len(_response_cache) > _CACHE_MAXSIZE:
+            _response_cache.popitem(last=False)
+
+# Requests currently being sent, by cache key. An identical request arriving
+# meanwhile (another seed or strategy on the same tick) waits for the first
+# one's response instead of making its own call.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _join_inflight(key):
+    """Return (future, owner): owner must send the request and call _finish_inflight."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = _inflight[key] = Future()
+        return future, True
+
+def _finish_inflight(key, future, response: str):
+    """Hand response to every waiter on key and stop coalescing on it."""
+    with _inflight_lock:
+        del _inflight[key]
+    future.set_result(response)
+
+@atexit.register
+def _log_cache_stats():
+    lookups = _cache_stats["hits"] + _cache_stats["misses"]
+    if lookups:
+        print(f"LLM response cache: {_cache_stats['hits']} hits, {_cache_stats['misses']} misses "
+              f"({_cache_stats['hits'] / lookups:.0%} hit rate)")
+
+# Canned responses, serialized once: provider error fallbacks and the mock plan
+_FALLBACK_GROQ_JSON = json.dumps({
+    "commands": [
+        {"agent_id": "medic1", "type": "move", "to": [5, 5]},
+        {"agent_id": "truck1", "type": "move", "to": [3, 4]}
+    ]
+})
+
+_FALLBACK_GEMINI_JSON = json.dumps({
+    "commands": [
+        {"agent_id": "medic1", "type": "move", "to": [10, 10]},
+        {"agent_id": "medic2", "type": "move", "to": [12, 12]},
+        {"agent_id": "truck1", "type": "move", "to": [8, 8]},
+        {"agent_id": "drone1", "type": "move", "to": [15, 15]}
+    ]
+})
+
+_FALLBACK_MOCK_JSON = json.dumps({
+    "commands": [
+        {"agent_id": "medic1", "type": "move", "to": [7, 7]},
+        {"agent_id": "medic2", "type": "move", "to": [9, 9]},
+        {"agent_id": "truck1", "type": "act", "action_name": "extinguish_fire"},
+        {"agent_id": "drone1", "type": "move", "to": [12, 12]}
+    ]
+})
+
+_GROQ_MODEL = "llama-3.3-70b-versatile"  # Latest Groq model
+_GEMINI_MODEL = "gemini-1.5-flash"  # Latest, fastest Gemini model
+# Alternative: "gemini-1.5-pro" (more capable but slower)
+
+# Base instruction sent on every Groq call; caller system prompts are appended
+_GROQ_SYSTEM = "You are a rigorous crisis planner. Always output valid JSON with commands. Respond ONLY with the JSON object, no additional text."
+
+_decoder = json.JSONDecoder()
+
+# Full-document parser; orjson when available (it has no raw_decode, so the
+# scan below keeps the stdlib decoder)
+_loads = orjson.loads if orjson is not None else json.loads
+
+def _extract_last_json_object(text: str):
+    """
+    Return the source of the last complete top-level JSON object in text, or None.
     
-    if provider == "groq":
+    Each '{' is handed to the C-implemented raw_decode; on success the scan
+    resumes after the decoded object, so nested objects and braces inside
+    strings are never mistaken for the outer object.
+    """
+    # Fast path: the whole response is one object (JSON mode, mock)
+    stripped = text.strip()
+    if stripped.startswith('{') and stripped.endswith('}'):
         try:
-            from groq import Groq
-            api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
-                raise ValueError("GROQ_API_KEY environment variable not set")
-                
-            client = Groq(api_key=api_key)
-            resp = client.chat.completions.create(
-                model=model_name,
-                messages=[{"role":"system","content":"You are a rigorous crisis planner. Always output valid JSON with commands. Respond ONLY with the JSON object, no additional text."},
-                          {"role":"user","content":prompt}],
-                temperature=temperature,
-                response_format={"type": "json_object"}
-            )
-            response = resp.choices[0].message.content
-            return response
-            
-        except Exception as e:
-            print(f"Error calling Groq: {e}")
-            # Return proper JSON fallback
-            return json.dumps({
-                "commands": [
-                    {"agent_id": "medic1", "type": "move", "to": [5, 5]},
-                    {"agent_id": "truck1", "type": "move", "to": [3, 4]}
-                ]
-            })
-    elif provider == "gemini":
+            _loads(stripped)
+            return stripped
+        except ValueError:
+            pass
+    
+    found = None
+    start = text.find('{')
+    while start != -1:
         try:
-            import google.generativeai as genai
-            api_key = os.getenv("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY environment variable not set")
-                
-            genai.configure(api_key=api_key)
-            
-            # Use the latest API with proper model configuration
-            generation_config = {
-                "temperature": temperature,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            }
-            
-            safety_settings = [
-                {
-                    "category": "HARM_CATEGORY_HARASSMENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_HATE_SPEECH",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                }
-            ]
-            
-            model = genai.GenerativeModel(
-                model_name=model_name,
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
-            
-            # Generate content with proper error handling
-            response = model.generate_content(prompt)
-            
-            if not response.text:
-                raise ValueError("Empty response from Gemini")
-                
-            # Try to extract JSON from response
-            text_response = response.text.strip()
-            
-            # Handle cases where response might be wrapped in markdown or text
-            if text_response.startswith('```json'):
-                # Remove markdown code blocks
-                text_response = text_response.replace('```json', '').replace('```', '').strip()
-            elif text_response.startswith('```'):
-                text_response = text_response.replace('```', '').strip()
-            
-            # Extract JSON if it's embedded in text
-            json_start = text_response.find('{')
-            json_end = text_response.rfind('}') + 1
-            
-            if json_start != -1 and json_end > json_start:
-                json_str = text_response[json_start:json_end]
-                try:
-                    # Validate it's proper JSON
-                    json.loads(json_str)
-                    return json_str
-                except json.JSONDecodeError:
-                    # If extraction fails, use the whole response
-                    return text_response
-            else:
-                return text_response
-            
-        except Exception as e:
-            print(f"Error calling Gemini: {e}")
-            # Return proper JSON fallback with more realistic commands
-            return json.dumps({
-                "commands": [
-                    {"agent_id": "medic1", "type": "move", "to": [10, 10]},
-                    {"agent_id": "medic2", "type": "move", "to": [12, 12]},
-                    {"agent_id": "truck1", "type": "move", "to": [8, 8]},
-                    {"agent_id": "drone1", "type": "move", "to": [15, 15]}
-                ]
-            })
-    else:
-        # Return more realistic mock response for better simulation
-        return json.dumps({
-            "commands": [
-                {"agent_id": "medic1", "type": "move", "to": [7, 7]},
-                {"agent_id": "medic2", "type": "move", "to": [9, 9]},
-                {"agent_id": "truck1", "type": "act", "action_name": "extinguish_fire"},
-                {"agent_id": "drone1", "type": "move", "to": [12, 12]}
-            ]
-        })
\ No newline at end of file
+            _, end = _decoder.raw_decode(text, start)
+        except ValueError:
+            start = text.find('{', start + 1)
+            continue
+        found = (start, end)
+        start = text.find('{', end)
+    return text[found[0]:found[1]] if found else None
+
+class _PlanStreamScanner:
+    """
+    Incremental brace-depth scanner over streamed response text.
+    
+    Each piece is scanned once, tracking string literals and escapes, so the
+    end of a top-level object is seen the moment its closing brace arrives
+    without re-parsing the text received so far.
+    """
+    
+    def __init__(self):
+        self.parts = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = None
+    
+    def text(self) -> str:
+        return "".join(self.parts)
+    
+    def feed(self, piece: str) -> bool:
+        """Add piece; True once a complete top-level object with "commands" has arrived."""
+        offset = self._length
+        self.parts.append(piece)
+        self._length += len(piece)
+        for i, ch in enumerate(piece):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = self._depth > 0
+            elif ch == '{':
+                if self._depth == 0:
+                    self._start = offset + i
+                self._depth += 1
+            elif ch == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0 and '"commands"' in self.text()[self._start:offset + i + 1]:
+                    return True
+        return False
+
+def _collect_stream(pieces, stop_early: bool = True) -> str:
+    """
+    Concatenate streamed text pieces. With stop_early (JSON-mode responses
+    only), stop once a complete JSON object containing "commands" has
+    arrived. Free-text responses are read to the end, since a later object
+    may correct a drafted plan and _extract_last_json_object takes the last.
+    """
+    if not stop_early:
+        return "".join(pieces)
+    scanner = _PlanStreamScanner()
+    for piece in pieces:
+        if scanner.feed(piece):
+            break
+    return scanner.text()
+
+def init_llm():
+    """
+    Create the configured provider's client up front, so the first planning
+    tick doesn't pay for SDK import and client construction.
+    """
+    try:
+        if _PROVIDER == "groq":
+            _get_groq_client()
+        elif _PROVIDER == "gemini":
+            _configure_gemini()
+    except Exception as e:
+        print(f"Warning: could not initialize {_PROVIDER} client: {e}")
+
+def llm_complete(prompt: str, model: str = None, temperature: float = 0.2, system: str = None, header: str = None,
+                 strict_json: bool = False) -> str:
+    """Legacy function for backward compatibility."""
+    return get_llm_response(prompt, temperature, system=system, header=header, strict_json=strict_json)
+
+def llm_complete_batch(prompts: list, model: str = None, temperature: float = 0.2, system: str = None, header: str = None,
+                       strict_json: bool = False) -> list:
+    """
+    Complete several prompts concurrently, returning responses in prompt order.
+    
+    Cache misses are sent together as coroutines on the shared async client
+    (see _llm_async), so they are in flight at once over one connection pool
+    and the provider can batch them. Identical cacheable prompts are sent
+    once and share the response, also with identical requests already in
+    flight elsewhere. Cache and fallbacks match get_llm_response.
+    """
+    if _provider_complete is None or len(prompts) <= 1:
+        return [get_llm_response(prompt, temperature, system=system, header=header, strict_json=strict_json)
+                for prompt in prompts]
+    
+    from ._llm_async import complete_many
+    
+    keys = [_cache_key(_PROVIDER, prompt, temperature, system, header, strict_json) if _cache_enabled(temperature) else None
+            for prompt in prompts]
+    responses = [_cache_lookup(key) for key in keys]
+    
+    # cache key (prompt index when caching is off) -> indices of the prompts sharing it
+    groups = {}
+    for i, response in enumerate(responses):
+        if response is None:
+            groups.setdefault(keys[i] if keys[i] is not None else i, []).append(i)
+    
+    # Groups this call sends (with their in-flight future, None when uncached)
+    # and groups another caller is already sending
+    owned, waiting = {}, {}
+    for group, indices in groups.items():
+        if keys[indices[0]] is None:
+            owned[group] = None
+            continue
+        future, owner = _join_inflight(group)
+        (owned if owner else waiting)[group] = future
+    
+    sent = list(owned)
+    try:
+        results = complete_many([prompts[groups[group][0]] for group in sent], temperature=temperature, system=system,
+                                header=header, strict_json=strict_json)
+    except Exception as e:
+        results = [e] * len(sent)
+    for group, result in zip(sent, results):
+        if isinstance(result, Exception):
+            print(f"Error calling {_provider_label}: {result}")
+            response = _provider_fallback
+        else:
+            response = result
+            _cache_store(keys[groups[group][0]], result)
+        if owned[group] is not None:
+            _finish_inflight(group, owned[group], response)
+        for i in groups[group]:
+            responses[i] = response
+    
+    for group, future in waiting.items():
+        response = future.result()
+        for i in groups[group]:
+            responses[i] = response
+    return responses
+
+def _persistent_complete(key, prompt: str, temperature: float, system: str = None, header: str = None,
+                         strict_json: bool = False) -> str:
+    """
+    Call the provider through the on-disk semantic cache (see semantic_cache),
+    so reruns reuse responses from earlier processes. key None: caching off.
+    """
+    from .semantic_cache import get_semantic_cache
+    disk = get_semantic_cache() if key is not None else None
+    if disk is None:
+        return _provider_complete(prompt, temperature, system, header, strict_json)
+    
+    # Responses never cross scenarios; similar prompts only match within
+    # the same scenario, provider, system, header and settings
+    scenario = repr(_scenario)
+    prompt_hash = "|".join(map(str, (scenario,) + key))
+    scope = "|".join(map(str, (scenario,) + _cache_key(_PROVIDER, "", temperature, system, header, strict_json)))
+    response = disk.lookup(prompt_hash, scope, prompt)
+    if response is None:
+        response = _provider_complete(prompt, temperature, system, header, strict_json)
+        disk.store(prompt_hash, scope, prompt, response)
+    return response
+
+def get_llm_response(prompt: str, temperature: float = 0.2, system: str = None, header: str = None,
+                     strict_json: bool = False) -> str:
+    """
+    Complete prompt with the configured provider.
+    
+    system is sent as a separate system message (Gemini: system_instruction)
+    rather than prepended to prompt. Keep it byte-identical across calls so
+    provider-side prompt caching can reuse the prefix.
+    
+    header is an optional second prefix part for content that is stable
+    within an episode but not across scenarios (grid, depot). It is sent
+    between system and prompt, always in that order.
+    
+    strict_json asks the provider for constrained decoding against the
+    commands schema (Groq always runs in JSON mode).
+    
+    Successful responses at temperature <= 0.2 are cached in-process, so a
+    repeated prompt never reaches the network, and concurrent identical
+    requests share a single call; set CACHE_DISABLE=1 to turn this off.
+    """
+    if _provider_complete is None:
+        # Mock provider: every call gets the same canned plan
+        return _FALLBACK_MOCK_JSON
+    
+    key = _cache_key(_PROVIDER, prompt, temperature, system, header, strict_json) if _cache_enabled(temperature) else None
+    cached = _cache_lookup(key)
+    if cached is not None:
+        return cached
+    
+    if key is not None:
+        future, owner = _join_inflight(key)
+        if not owner:
+            # The same request is already on the wire; share its response
+            return future.result()
+    
+    # Return proper JSON fallback unless the call succeeds
+    response = _provider_fallback
+    try:
+        response = _persistent_complete(key, prompt, temperature, system, header, strict_json)
+        # Only real responses are cached, never error fallbacks
+        _cache_store(key, response)
+    except Exception as e:
+        print(f"Error calling {_provider_label}: {e}")
+    finally:
+        if key is not None:
+            _finish_inflight(key, future, response)
+    return response
+
+@functools.lru_cache(maxsize=1)
+def _get_groq_client():
+    """Groq client, created once; it keeps its HTTP connection pool alive between calls."""
+    from groq import Groq
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY environment variable not set")
+    return Groq(api_key=api_key)
+
+def _groq_messages(prompt: str, system: str = None, header: str = None) -> list:
+    """Chat messages in cache-friendly order: system, scenario header, prompt."""
+    messages = [{"role":"system","content":_GROQ_SYSTEM + "\n\n" + system if system else _GROQ_SYSTEM}]
+    if header:
+        messages.append({"role":"user","content":header})
+    messages.append({"role":"user","content":prompt})
+    return messages
+
+def _groq_complete(prompt: str, temperature: float, system: str = None, header: str = None,
+                   strict_json: bool = False) -> str:
+    """Call Groq's chat completions API (always in JSON mode); raises on any error."""
+    client = _get_groq_client()
+    stream = client.chat.completions.create(
+        model=_GROQ_MODEL,
+        messages=_groq_messages(prompt, system, header),
+        temperature=temperature,
+        response_format={"type": "json_object"},
+        stream=True
+    )
+    # json_object mode emits nothing but the JSON, so stopping at the first
+    # complete plan object never cuts off anything useful
+    try:
+        return _collect_stream(chunk.choices[0].delta.content or "" for chunk in stream)
+    finally:
+        stream.close()
+
+# Gemini settings shared by every model; only the temperature varies per call
+_BASE_GENERATION_CONFIG = {
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+# Constrained decoding: Gemini can only emit JSON matching the commands schema
+_STRICT_JSON_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": COMMANDS_RESPONSE_SCHEMA,
+}
+
+_SAFETY_SETTINGS = tuple(
+    {"category": category, "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
+    for category in (
+        "HARM_CATEGORY_HARASSMENT",
+        "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "HARM_CATEGORY_DANGEROUS_CONTENT",
+    )
+)
+
+@functools.lru_cache(maxsize=1)
+def _configure_gemini():
+    """Configure the Gemini SDK once and return the module."""
+    import google.generativeai as genai
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    genai.configure(api_key=api_key)
+    return genai
+
+@functools.lru_cache(maxsize=8)
+def _get_gemini_model(model_name: str, temperature: float, system: str = None, strict_json: bool = False):
+    """GenerativeModel per (model, temperature, system instruction, JSON mode), built on first use."""
+    genai = _configure_gemini()
+    generation_config = {**_BASE_GENERATION_CONFIG, "temperature": temperature}
+    if strict_json:
+        generation_config.update(_STRICT_JSON_CONFIG)
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=generation_config,
+        safety_settings=list(_SAFETY_SETTINGS),
+        system_instruction=system
+    )
+
+def _gemini_complete(prompt: str, temperature: float, system: str = None, header: str = None,
+                     strict_json: bool = False) -> str:
+    """Call Gemini and extract the JSON part of its response; raises on any error."""
+    model = _get_gemini_model(_GEMINI_MODEL, temperature, system, strict_json)
+    
+    # Stream the response; in JSON mode stop as soon as the plan JSON is complete
+    text_response = _collect_stream((chunk.text for chunk in model.generate_content([header, prompt] if header else prompt, stream=True)),
+                                    stop_early=strict_json)
+    return _clean_gemini_text(text_response)
+
+def _clean_gemini_text(text_response: str) -> str:
+    """Strip markdown fences and surrounding prose from a Gemini response."""
+    if not text_response:
+        raise ValueError("Empty response from Gemini")
+        
+    # Try to extract JSON from response
+    text_response = text_response.strip()
+    
+    # Handle cases where response might be wrapped in markdown or text
+    if text_response.startswith('```json'):
+        # Remove markdown code blocks
+        text_response = text_response.replace('```json', '').replace('```', '').strip()
+    elif text_response.startswith('```'):
+        text_response = text_response.replace('```', '').strip()
+    
+    # Extract JSON if it's embedded in text; otherwise use the whole response
+    return _extract_last_json_object(text_response) or text_response
+
+# provider -> (complete function, display name, JSON returned on errors).
+# Anything else is the mock provider, which never leaves the process.
+_PROVIDER_DISPATCH = {
+    "groq": (_groq_complete, "Groq", _FALLBACK_GROQ_JSON),
+    "gemini": (_gemini_complete, "Gemini", _FALLBACK_GEMINI_JSON),
+}
+_provider_complete, _provider_label, _provider_fallback = _PROVIDER_DISPATCH.get(_PROVIDER, (None, "mock", _FALLBACK_MOCK_JSON))
@@ -0,0 +1,111 @@
+# reasoning/plan_cache.py
+"""
+Plan-template cache for the per-tick planners.
+
+Consecutive ticks usually share the same agents and a slowly-changing
+survivor set, so a successful LLM plan is stored as a template keyed by a
+coarse situation fingerprint. Move targets are kept as offsets from the
+issuing agent's position and re-anchored on the current positions at lookup
+time, which lets a similar tick reuse the plan without an LLM round-trip.
+
+Templates only apply within one scenario: begin_episode() clears the cache
+and tags every key with the episode's map and seed, and a re-anchored plan
+that would send an agent off the grid or onto rubble is treated as a miss.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .schema_validator import validate_assignment_schema
+
+_MAXSIZE = 64
+
+_templates: "OrderedDict[tuple, list]" = OrderedDict()
+_lock = threading.Lock()
+_scenario = None
+
+def begin_episode(scenario=None):
+    """Forget all templates and key new ones by scenario (e.g. map and seed)."""
+    global _scenario
+    with _lock:
+        _templates.clear()
+        _scenario = scenario
+
+def _enabled() -> bool:
+    return not os.getenv("CACHE_DISABLE")
+
+def _fingerprint(context: Dict[str, Any]) -> tuple:
+    """Coarse situation key: scenario, agent ids, survivors with deadline buckets, obstacle counts."""
+    return (
+        _scenario,
+        tuple(sorted(str(a['id']) for a in context.get('agents', []))),
+        tuple((s['id'], s.get('deadline', 999) // 25) for s in context.get('survivors', [])),
+        len(context.get('fires', [])),
+        len(context.get('rubble', []))
+    )
+
+def _positions(context: Dict[str, Any]) -> Dict[str, list]:
+    return {str(a['id']): a['pos'] for a in context.get('agents', [])}
+
+def to_template(context: Dict[str, Any], plan: Dict[str, Any]) -> list:
+    """Plan commands with move targets stored as offsets from the issuing agent."""
+    positions = _positions(context)
+    template = []
+    for cmd in plan['commands']:
+        cmd = dict(cmd)
+        pos = positions.get(str(cmd.get('agent_id')))
+        if cmd.get('type') == 'move' and pos is not None:
+            to = cmd.pop('to')
+            cmd['offset'] = [to[0] - pos[0], to[1] - pos[1]]
+        template.append(cmd)
+    return template
+
+def from_template(context: Dict[str, Any], template: list) -> Optional[Dict[str, Any]]:
+    """Re-anchor template on context's agent positions; None if it does not fit."""
+    positions = _positions(context)
+    grid = context.get('grid', {})
+    width, height = grid.get('width', 20), grid.get('height', 20)
+    rubble = {tuple(cell) for cell in context.get('rubble', [])}
+    commands = []
+    for cmd in template:
+        cmd = dict(cmd)
+        pos = positions.get(str(cmd.get('agent_id')))
+        if pos is None:
+            return None  # Issued to an agent that is not on the map
+        offset = cmd.pop('offset', None)
+        if offset is not None:
+            x, y = pos[0] + offset[0], pos[1] + offset[1]
+            if not (0 <= x < width and 0 <= y < height) or (x, y) in rubble:
+                return None  # Template does not fit this tick; plan afresh
+            cmd['to'] = [x, y]
+        commands.append(cmd)
+    
+    plan = {"commands": commands}
+    is_valid, _ = validate_assignment_schema(plan)
+    return plan if is_valid else None
+
+def lookup(context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the cached plan adapted to context, or None on a miss."""
+    if not _enabled():
+        return None
+    key = _fingerprint(context)
+    with _lock:
+        template = _templates.get(key)
+        if template is None:
+            return None
+        _templates.move_to_end(key)
+    return from_template(context, template)
+
+def store(context: Dict[str, Any], plan: Dict[str, Any]):
+    """Keep plan as a template for situations with the same fingerprint."""
+    if not _enabled() or not plan.get('commands'):
+        return
+    template = to_template(context, plan)
+    key = _fingerprint(context)
+    with _lock:
+        _templates[key] = template
+        _templates.move_to_end(key)
+        if len(_templates) > _MAXSIZE:
+            _templates.popitem(last=False)
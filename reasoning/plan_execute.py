@@ -1,26 +1,12 @@
 # reasoning/plan_execute.py
 import json
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
 from .llm_client import llm_complete
+from ._format import format_agents, format_survivors
 from .schema_validator import enforce_assignment_schema, create_schema_enforcement_prompt, create_fallback_plan
 
-def make_plan_execute_plan(context, strategy: str = "plan_execute", scratchpad: str = ""):
-    """
-    Entry point used by planner.make_plan(...):
-      returns dict with commands
-    """
-    return plan_and_execute(context, scratchpad)
-
-def plan_and_execute(context: dict, scratchpad: str = "") -> dict:
-    """
-    Plan-and-Execute reasoning framework for crisis response.
-    
-    This approach separates the planning into two phases:
-    1. HIGH-LEVEL PLANNING: Analyze situation and create strategic plan
-    2. EXECUTION PLANNING: Convert strategic plan into specific agent commands
-    """
-    
-    # Phase 1: High-level strategic planning
-    strategy_prompt = """You are a crisis response strategist. Your job is to create a high-level strategic plan.
+_STRATEGY_SYSTEM = """You are a crisis response strategist. Your job is to create a high-level strategic plan.
 
 ANALYZE the current crisis situation and create a strategic plan with these components:
 
@@ -31,34 +17,7 @@ ANALYZE the current crisis situation and create a strategic plan with these comp
 
 Output your strategic plan as a clear, structured response (not JSON)."""
 
-    strategy_context = f"""Current crisis situation:
-
-Grid: {context.get('grid', {})}
-Depot: {context.get('depot', [])}
-
-Agents:
-{format_agents(context.get('agents', []))}
-
-Hospitals: {context.get('hospitals', [])}
-Fires: {context.get('fires', [])}
-Rubble: {context.get('rubble', [])}
-Survivors: {format_survivors(context.get('survivors', []))}
-
-Previous actions: {scratchpad if scratchpad else 'None'}
-
-Create your strategic plan:"""
-
-    try:
-        strategy_response = llm_complete(strategy_prompt + "\n\n" + strategy_context, temperature=0.1)
-    except Exception as e:
-        print(f"Error in strategy planning: {e}")
-        strategy_response = "Focus on immediate threats and coordinate agent actions."
-
-    # Phase 2: Convert strategy to specific commands
-    execution_prompt = """You are a crisis response executor. Convert the strategic plan into specific agent commands.
-
-STRATEGIC PLAN:
-{strategy}
+_EXECUTION_SYSTEM = """You are a crisis response executor. Convert the strategic plan into specific agent commands.
 
 AVAILABLE ACTIONS:
 - move: Move an agent to a specific position [x, y]
@@ -69,19 +28,16 @@ AVAILABLE ACTIONS:
 - recharge: Recharge battery at depot (drones only)
 - resupply: Resupply water/tools at depot (trucks only)
 
-CURRENT SITUATION:
-{current_context}
-
 OUTPUT FORMAT: You must output valid JSON with exactly this structure:
-{{
+{
   "commands": [
-    {{"agent_id": "2", "type": "move", "to": [5, 7]}},
-    {{"agent_id": "3", "type": "act", "action_name": "pickup_survivor"}},
-    {{"agent_id": "4", "type": "act", "action_name": "drop_at_hospital"}},
-    {{"agent_id": "1", "type": "act", "action_name": "extinguish_fire"}},
-    {{"agent_id": "5", "type": "act", "action_name": "clear_rubble"}}
+    {"agent_id": "2", "type": "move", "to": [5, 7]},
+    {"agent_id": "3", "type": "act", "action_name": "pickup_survivor"},
+    {"agent_id": "4", "type": "act", "action_name": "drop_at_hospital"},
+    {"agent_id": "1", "type": "act", "action_name": "extinguish_fire"},
+    {"agent_id": "5", "type": "act", "action_name": "clear_rubble"}
   ]
-}}
+}
 
 Valid action_name values: pickup_survivor, drop_at_hospital, extinguish_fire, clear_rubble, recharge, resupply
 
@@ -92,29 +48,88 @@ IMPORTANT:
 - Coordinates must be within the grid bounds
 - Execute the strategic plan with specific, actionable commands"""
 
-    execution_context = f"""Grid: {context.get('grid', {})}
-Depot: {context.get('depot', [])}
+# Static prefixes, built once and sent as system messages so they stay
+# byte-identical across calls (provider prompt caching keys on them)
+_EXECUTION_SYSTEM_PROMPT = _EXECUTION_SYSTEM + "\n\n" + create_schema_enforcement_prompt()
+
+_SITUATION_TEMPLATE = Template("""Grid: $grid
+Depot: $depot
 
 Agents:
-{format_agents(context.get('agents', []))}
+$agents
+
+Hospitals: $hospitals
+Fires: $fires
+Rubble: $rubble
+Survivors: $survivors
+
+Previous actions: $scratchpad""")
+
+_STRATEGY_USER_TEMPLATE = Template("""Current crisis situation:
 
-Hospitals: {context.get('hospitals', [])}
-Fires: {context.get('fires', [])}
-Rubble: {context.get('rubble', [])}
-Survivors: {format_survivors(context.get('survivors', []))}
+$situation
 
-Previous actions: {scratchpad if scratchpad else 'None'}
+Create your strategic plan:""")
 
-Now execute the strategic plan with specific commands:"""
+# Execution prompt is "STRATEGIC PLAN:\n" + strategy + tail; the tail only
+# needs the situation, so it is built while the strategy call is in flight
+_EXECUTION_USER_TAIL_TEMPLATE = Template("""
 
-    # Add schema enforcement to execution prompt
-    full_execution_prompt = execution_prompt.format(
-        strategy=strategy_response,
-        current_context=execution_context
-    ) + "\n\n" + create_schema_enforcement_prompt()
+CURRENT SITUATION:
+$situation
+
+Now execute the strategic plan with specific commands:""")
+
+# Runs the strategy-phase LLM call alongside execution prompt assembly
+_executor = ThreadPoolExecutor(max_workers=4)
+
+def make_plan_execute_plan(context, strategy: str = "plan_execute", scratchpad: str = ""):
+    """
+    Entry point used by planner.make_plan(...):
+      returns dict with commands
+    """
+    return plan_and_execute(context, scratchpad)
+
+def plan_and_execute(context: dict, scratchpad: str = "") -> dict:
+    """
+    Plan-and-Execute reasoning framework for crisis response.
+    
+    This approach separates the planning into two phases:
+    1. HIGH-LEVEL PLANNING: Analyze situation and create strategic plan
+    2. EXECUTION PLANNING: Convert strategic plan into specific agent commands
+    """
     
+    # The situation block is identical in both phases; format it once
+    situation = _SITUATION_TEMPLATE.substitute(
+        grid=context.get('grid', {}),
+        depot=context.get('depot', []),
+        agents=format_agents(context.get('agents', [])),
+        hospitals=context.get('hospitals', []),
+        fires=context.get('fires', []),
+        rubble=context.get('rubble', []),
+        survivors=format_survivors(context.get('survivors', [])),
+        scratchpad=scratchpad if scratchpad else 'None'
+    )
+    
+    # Phase 1: High-level strategic planning
+    strategy_context = _STRATEGY_USER_TEMPLATE.substitute(situation=situation)
+
+    strategy_future = _executor.submit(llm_complete, strategy_context, temperature=0.1, system=_STRATEGY_SYSTEM)
+    
+    # Everything in the execution prompt except the strategy, while it is generated
+    execution_tail = _EXECUTION_USER_TAIL_TEMPLATE.substitute(situation=situation)
+    
+    try:
+        strategy_response = strategy_future.result()
+    except Exception as e:
+        print(f"Error in strategy planning: {e}")
+        strategy_response = "Focus on immediate threats and coordinate agent actions."
+
+    # Phase 2: Convert strategy to specific commands
+    execution_context = "STRATEGIC PLAN:\n" + strategy_response + execution_tail
+
     try:
-        execution_response = llm_complete(full_execution_prompt, temperature=0.1)
+        execution_response = llm_complete(execution_context, temperature=0.1, system=_EXECUTION_SYSTEM_PROMPT, strict_json=True)
         
         # Use assignment schema validation
         plan, is_valid, error_msg = enforce_assignment_schema(execution_response)
@@ -125,9 +140,9 @@ Now execute the strategic plan with specific commands:"""
         else:
             print(f"❌ Plan-Execute: Invalid JSON schema: {error_msg}")
             # Try one retry with schema reminder
-            retry_prompt = full_execution_prompt + f"\n\nPREVIOUS RESPONSE WAS INVALID: {error_msg}\n\nPlease output ONLY valid JSON matching the exact schema above."
+            retry_prompt = execution_context + f"\n\nPREVIOUS RESPONSE WAS INVALID: {error_msg}\n\nPlease output ONLY valid JSON matching the exact schema in the instructions."
             
-            retry_response = llm_complete(retry_prompt, temperature=0.1)
+            retry_response = llm_complete(retry_prompt, temperature=0.1, system=_EXECUTION_SYSTEM_PROMPT, strict_json=True)
             retry_plan, retry_valid, retry_error = enforce_assignment_schema(retry_response)
             
             if retry_valid and retry_plan:
@@ -140,35 +155,3 @@ Now execute the strategic plan with specific commands:"""
     except Exception as e:
         print(f"Error in execution planning: {e}")
         return create_fallback_plan()
-
-def format_agents(agents):
-    """Format agents list for the prompt"""
-    if not agents:
-        return "None"
-    
-    formatted = []
-    for agent in agents:
-        agent_str = f"- {agent['kind']} (ID: {agent['id']}) at {agent['pos']}"
-        if agent.get('battery') is not None:
-            agent_str += f", battery: {agent['battery']}"
-        if agent.get('water') is not None:
-            agent_str += f", water: {agent['water']}"
-        if agent.get('tools') is not None:
-            agent_str += f", tools: {agent['tools']}"
-        if agent.get('carrying'):
-            agent_str += ", carrying survivor"
-        formatted.append(agent_str)
-    
-    return "\n".join(formatted)
-
-def format_survivors(survivors):
-    """Format survivors list for the prompt"""
-    if not survivors:
-        return "None"
-    
-    formatted = []
-    for survivor in survivors:
-        deadline = survivor.get('deadline', 'unknown')
-        formatted.append(f"- Survivor {survivor['id']} at {survivor['pos']}, deadline: {deadline}")
-    
-    return "\n".join(formatted)
\ No newline at end of file
@@ -4,63 +4,142 @@
 Main planner that routes to different reasoning strategies.
 """
 
-from typing import Dict, Any
-import importlib.util
-import sys
-from pathlib import Path
-
-# Add the current directory to Python path
-current_dir = Path(__file__).parent.parent
-sys.path.insert(0, str(current_dir))
-
-# Import functions with error handling
-def import_module(module_name, function_name, default_function):
-    """Import a function from a module with fallback."""
-    try:
-        module = __import__(f"reasoning.{module_name}", fromlist=[function_name])
-        return getattr(module, function_name)
-    except ImportError as e:
-        print(f"Warning: {module_name} not available: {e}")
-        return default_function
-
-# Create fallback functions
-def fallback_react_plan(context, strategy="react", scratchpad=""):
-    return {"commands": []}
-
-def fallback_reflexion_plan(context, strategy="reflexion", scratchpad=""):
-    return {"commands": []}
-
-def fallback_plan_execute_plan(context, strategy="plan_execute", scratchpad=""):
-    return {"commands": []}
-
-def fallback_fallback_plan(context):
-    return {"commands": []}
+from typing import Callable, Dict, Any, List
+import functools
+import importlib
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-# Import actual functions or use fallbacks
 try:
-    from reasoning.react import make_react_plan
+    from datasketch import MinHash, MinHashLSH
 except ImportError:
-    make_react_plan = fallback_react_plan
+    MinHash = None
 
 try:
-    from reasoning.reflexion import make_reflexion_plan
+    from reasoning.llm_client import init_llm, set_scenario
 except ImportError:
-    make_reflexion_plan = fallback_reflexion_plan
+    def init_llm():
+        pass
+    
+    def set_scenario(scenario):
+        pass
 
-try:
-    from reasoning.plan_execute import make_plan_execute_plan
-except ImportError:
-    make_plan_execute_plan = fallback_plan_execute_plan
+def _null_plan(context, strategy="", scratchpad=""):
+    """Empty plan used when a strategy module cannot be imported."""
+    return {"commands": []}
 
 try:
     from reasoning.fallback_planner import make_fallback_plan
 except ImportError:
-    make_fallback_plan = fallback_fallback_plan
+    def make_fallback_plan(context):
+        return {"commands": []}
 
-try:
-    from reasoning.cot import make_cot_plan
-except ImportError:
-    make_cot_plan = fallback_react_plan
+from reasoning import plan_cache
+
+# strategy name -> planner(state, strategy, scratchpad), resolved once at import
+_STRATEGY_TABLE: Dict[str, Callable] = {}
+for _name, _attr in [("react", "make_react_plan"), ("reflexion", "make_reflexion_plan"),
+                     ("plan_execute", "make_plan_execute_plan"), ("cot", "make_cot_plan")]:
+    try:
+        _STRATEGY_TABLE[_name] = getattr(importlib.import_module(f"reasoning.{_name}"), _attr)
+    except ImportError as e:
+        print(f"Warning: {_name} not available: {e}")
+        _STRATEGY_TABLE[_name] = _null_plan
+
+# Build the LLM client once at import instead of on the first planning tick
+init_llm()
+
+def begin_episode(map_name: str, seed: int):
+    """Reset per-episode planner caches; call before the first tick of each run."""
+    plan_cache.begin_episode((map_name, seed))
+    set_scenario((map_name, seed))
+    _semantic_reset((map_name, seed))
+
+# Plans are only reused when the provider is deterministic (mock). Resolved
+# once, after llm_client has loaded .env, like llm_client's own provider.
+_PLAN_CACHE_ENABLED = os.getenv("LLM_PROVIDER", "mock").lower() == "mock"
+
+# Strategies whose planning has side effects beyond the returned plan
+# (Reflexion updates its memory every tick); these always run the planner
+_STATEFUL_STRATEGIES = {"reflexion"}
+
+@functools.lru_cache(maxsize=1024)
+def _planned(strategy: str, state_key: str) -> str:
+    """Plan a canonical state once and keep the serialized result (stateless strategies only)."""
+    return json.dumps(_dispatch_plan(json.loads(state_key), strategy, ""))
+
+# Semantic plan cache: near-identical states (same agents, fires and rubble,
+# survivors with similar deadlines) reuse a previous plan of the same episode.
+# Each strategy/scratchpad pair has its own LSH index; plans are stored as
+# plan_cache templates and re-anchored on the current agent positions, so a
+# hit whose moves would leave the grid or hit rubble is treated as a miss.
+# Entries are evicted least-recently-used and dropped by begin_episode().
+_SEMANTIC_THRESHOLD = 0.92
+_SEMANTIC_NUM_PERM = 128
+_SEMANTIC_MAXSIZE = 512
+_semantic_index = {}
+_semantic_plans = OrderedDict()
+_semantic_keys = itertools.count()
+_semantic_lock = threading.Lock()
+_semantic_scenario = None
+
+def _semantic_cache_enabled() -> bool:
+    """Opt-in with PLAN_SEMANTIC_CACHE=1; needs datasketch and is off with CACHE_DISABLE."""
+    return MinHash is not None and bool(os.getenv("PLAN_SEMANTIC_CACHE")) and not os.getenv("CACHE_DISABLE")
+
+def _semantic_reset(scenario):
+    """Forget all near-identical plans and key new ones by scenario."""
+    global _semantic_scenario
+    with _semantic_lock:
+        _semantic_index.clear()
+        _semantic_plans.clear()
+        _semantic_scenario = scenario
+
+def _state_minhash(state: Dict[str, Any]):
+    """MinHash over the state's planning-relevant features."""
+    features = [f"a:{a['id']}:{a['kind']}:{a['pos'][0]},{a['pos'][1]}:{bool(a.get('carrying'))}"
+                for a in state.get('agents', [])]
+    features += [f"f:{x},{y}" for x, y in state.get('fires', [])]
+    features += [f"r:{x},{y}" for x, y in state.get('rubble', [])]
+    features += [f"s:{s['pos'][0]},{s['pos'][1]}:{s.get('deadline', 0) // 10}"
+                 for s in state.get('survivors', [])]
+    minhash = MinHash(num_perm=_SEMANTIC_NUM_PERM)
+    minhash.update_batch([feature.encode() for feature in features])
+    return minhash
+
+def _semantic_lookup(state: Dict[str, Any], index_key: tuple, minhash):
+    """Return a cached plan re-anchored on state for a near-identical state, or None."""
+    with _semantic_lock:
+        index = _semantic_index.get(index_key)
+        if index is None:
+            return None
+        templates = []
+        for key in index.query(minhash):
+            _semantic_plans.move_to_end(key)
+            templates.append(_semantic_plans[key])
+    for template in templates:
+        plan = plan_cache.from_template(state, json.loads(template))
+        if plan is not None:
+            return plan
+    return None
+
+def _semantic_store(state: Dict[str, Any], index_key: tuple, minhash, plan: Dict[str, Any]):
+    """Remember plan for states similar to the one minhash was built from."""
+    template = json.dumps(plan_cache.to_template(state, plan))
+    with _semantic_lock:
+        index = _semantic_index.get(index_key)
+        if index is None:
+            index = _semantic_index[index_key] = MinHashLSH(threshold=_SEMANTIC_THRESHOLD, num_perm=_SEMANTIC_NUM_PERM)
+        key = (index_key, next(_semantic_keys))
+        index.insert(key, minhash)
+        _semantic_plans[key] = template
+        if len(_semantic_plans) > _SEMANTIC_MAXSIZE:
+            old_key, _ = _semantic_plans.popitem(last=False)
+            _semantic_index[old_key[0]].remove(old_key)
 
 def make_plan(state: Dict[str, Any], strategy: str = "react", scratchpad: str = "") -> Dict[str, Any]:
     """
@@ -77,20 +156,54 @@ def make_plan(state: Dict[str, Any], strategy: str = "react", scratchpad: str =
     
     strategy = strategy.lower()
     
+    if strategy in _STATEFUL_STRATEGIES:
+        # Replaying a cached plan would skip this tick's side effects
+        return _dispatch_plan(state, strategy, scratchpad)
+    
+    if _PLAN_CACHE_ENABLED:
+        # The mock provider ignores the scratchpad, so identical states plan identically
+        state_key = json.dumps(state, sort_keys=True, separators=(',', ':'))
+        return json.loads(_planned(strategy, state_key))
+    
+    if not _semantic_cache_enabled():
+        return _dispatch_plan(state, strategy, scratchpad)
+    
+    # Plans only transfer between states of the same episode planned with the same scratchpad
+    index_key = (_semantic_scenario, strategy, scratchpad)
+    minhash = _state_minhash(state)
+    plan = _semantic_lookup(state, index_key, minhash)
+    if plan is not None:
+        return plan
+    
+    plan = _dispatch_plan(state, strategy, scratchpad)
+    if plan.get("commands"):
+        # Empty (fallback) plans are not worth replaying
+        _semantic_store(state, index_key, minhash, plan)
+    return plan
+
+def make_plan_batch(states: List[Dict[str, Any]], strategy: str = "react", scratchpads: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    Plan several independent states (e.g. parallel simulations) at once.
+    
+    The LLM calls of all states are in flight together so the provider can
+    batch them. Plans are returned in the same order as states.
+    """
+    if scratchpads is None:
+        scratchpads = [""] * len(states)
+    if len(states) <= 1:
+        return [make_plan(state, strategy, scratchpad) for state, scratchpad in zip(states, scratchpads)]
+    with ThreadPoolExecutor(max_workers=min(8, len(states))) as executor:
+        return list(executor.map(lambda args: make_plan(args[0], strategy, args[1]), zip(states, scratchpads)))
+
+def _dispatch_plan(state: Dict[str, Any], strategy: str, scratchpad: str) -> Dict[str, Any]:
+    """Run the planner for strategy, falling back on unknown strategies or errors."""
+    planner = _STRATEGY_TABLE.get(strategy)
     try:
-        if strategy == "react":
-            return make_react_plan(state, strategy, scratchpad)
-        elif strategy == "reflexion":
-            return make_reflexion_plan(state, strategy, scratchpad)
-        elif strategy == "plan_execute":
-            return make_plan_execute_plan(state, strategy, scratchpad)
-        elif strategy == "cot":
-            # Chain-of-Thought
-            return make_cot_plan(state, strategy, scratchpad)
-        else:
+        if planner is None:
             # Default to fallback if unknown strategy
             print(f"Using fallback planner for strategy: {strategy}")
             return make_fallback_plan(state)
+        return planner(state, strategy, scratchpad)
             
     except Exception as e:
         print(f"Error in {strategy} planning: {e}, using fallback")
@@ -2,26 +2,12 @@
 import json
 import os
 from .llm_client import llm_complete
-from .schema_validator import enforce_assignment_schema, create_schema_enforcement_prompt, create_fallback_plan
+from . import plan_cache
+from ._format import format_agents, format_survivors, format_hospitals, format_fires, format_rubble
+from .schema_validator import (enforce_assignment_schema, create_schema_enforcement_prompt, create_fallback_plan,
+                               fix_common_schema_errors, validate_assignment_schema)
 
-def make_react_plan(context, strategy: str = "react", scratchpad: str = ""):
-    """
-    Entry point used by planner.make_plan(...):
-      returns dict with commands
-    """
-    return react_with_tools(context, scratchpad)
-
-def react_with_tools(context: dict, scratchpad: str = "") -> dict:
-    """
-    LLM-based ReAct (Reasoning + Acting) planner.
-    
-    Uses the LLM API to generate plans based on the current crisis situation.
-    The LLM reasons about the current state and generates appropriate commands
-    for all agents following the required JSON schema.
-    """
-    
-    # Build the prompt for the LLM
-    system_prompt = """You are a crisis response coordinator. Your job is to analyze the current situation and generate commands for emergency response agents.
+_SYSTEM_PROMPT = """You are a crisis response coordinator. Your job is to analyze the current situation and generate commands for emergency response agents.
 
 AVAILABLE ACTIONS:
 - move: Move an agent to a specific position [x, y]
@@ -72,6 +58,35 @@ IMPORTANT:
 - ALWAYS move medics toward survivors with low deadlines
 - Think strategically about priorities: survivors in danger, fires spreading, blocked roads"""
 
+# Survivor urgency as this prompt describes it: below 50 ticks is top priority
+_URGENCY_SCALE = ((50, 100), ("🚨 URGENT", "⚠️ WARNING", "✅ SAFE"))
+
+# Static prefix, built once and sent as the system message so it stays
+# byte-identical across calls (provider prompt caching keys on it)
+_SYSTEM_PREFIX = _SYSTEM_PROMPT + "\n\n" + create_schema_enforcement_prompt()
+
+def make_react_plan(context, strategy: str = "react", scratchpad: str = ""):
+    """
+    Entry point used by planner.make_plan(...):
+      returns dict with commands
+    """
+    return react_with_tools(context, scratchpad)
+
+def react_with_tools(context: dict, scratchpad: str = "") -> dict:
+    """
+    LLM-based ReAct (Reasoning + Acting) planner.
+    
+    Uses the LLM API to generate plans based on the current crisis situation.
+    The LLM reasons about the current state and generates appropriate commands
+    for all agents following the required JSON schema.
+    """
+    
+    # Reuse the plan from a similar earlier tick when there is one
+    cached = plan_cache.lookup(context)
+    if cached is not None:
+        print(f"✅ Reused cached plan with {len(cached['commands'])} commands")
+        return cached
+    
     # Create the user prompt with current context
     user_prompt = f"""Current crisis situation:
 
@@ -84,7 +99,7 @@ Agents:
 Hospitals: {format_hospitals(context.get('hospitals', []))}
 Fires: {format_fires(context.get('fires', []))}
 Rubble: {format_rubble(context.get('rubble', []))}
-Survivors: {format_survivors(context.get('survivors', []))}
+Survivors: {format_survivors(context.get('survivors', []), urgency=_URGENCY_SCALE)}
 
 Previous actions: {scratchpad if scratchpad else 'None'}
 
@@ -105,29 +120,37 @@ MOVEMENT PLAN:
 
 Output your plan as JSON with specific movement commands:"""
 
-    # Add schema enforcement to prompt
-    full_prompt = system_prompt + "\n\n" + create_schema_enforcement_prompt() + "\n\n" + user_prompt
-    
     # Get LLM response
     try:
-        response = llm_complete(full_prompt, temperature=0.1)
+        response = llm_complete(user_prompt, temperature=0.1, system=_SYSTEM_PREFIX)
         
         # Use assignment schema validation
         plan, is_valid, error_msg = enforce_assignment_schema(response)
         
         if is_valid and plan:
             print(f"✅ Valid plan generated with {len(plan.get('commands', []))} commands")
+            plan_cache.store(context, plan)
             return plan
         else:
             print(f"❌ Invalid JSON schema: {error_msg}")
+            
+            # Salvage recoverable schema errors locally before paying for a retry
+            if plan is not None:
+                fixed = fix_common_schema_errors(plan)
+                if fixed["commands"] and validate_assignment_schema(fixed)[0]:
+                    print(f"✅ Repaired plan to {len(fixed['commands'])} valid commands")
+                    plan_cache.store(context, fixed)
+                    return fixed
+            
             # Try one retry with schema reminder
-            retry_prompt = full_prompt + f"\n\nPREVIOUS RESPONSE WAS INVALID: {error_msg}\n\nPlease output ONLY valid JSON matching the exact schema above."
+            retry_prompt = user_prompt + f"\n\nPREVIOUS RESPONSE WAS INVALID: {error_msg}\n\nPlease output ONLY valid JSON matching the exact schema in the instructions."
             
-            retry_response = llm_complete(retry_prompt, temperature=0.1)
+            retry_response = llm_complete(retry_prompt, temperature=0.1, system=_SYSTEM_PREFIX)
             retry_plan, retry_valid, retry_error = enforce_assignment_schema(retry_response)
             
             if retry_valid and retry_plan:
                 print(f"✅ Valid plan generated on retry with {len(retry_plan.get('commands', []))} commands")
+                plan_cache.store(context, retry_plan)
                 return retry_plan
             else:
                 print(f"❌ Retry failed: {retry_error}, using fallback")
@@ -136,97 +159,3 @@ Output your plan as JSON with specific movement commands:"""
     except Exception as e:
         print(f"Error in ReAct planning: {e}")
         return create_fallback_plan()
-
-def format_agents(agents):
-    """Format agents list for the prompt"""
-    if not agents:
-        return "None"
-    
-    formatted = []
-    for agent in agents:
-        agent_str = f"- {agent['kind']} (ID: {agent['id']}) at {agent['pos']}"
-        if agent.get('battery') is not None:
-            agent_str += f", battery: {agent['battery']}"
-        if agent.get('water') is not None:
-            agent_str += f", water: {agent['water']}"
-        if agent.get('tools') is not None:
-            agent_str += f", tools: {agent['tools']}"
-        if agent.get('carrying'):
-            agent_str += ", carrying survivor"
-        formatted.append(agent_str)
-    
-    return "\n".join(formatted)
-
-def format_survivors(survivors):
-    """Format survivors list for the prompt with urgency indicators"""
-    if not survivors:
-        return "None"
-    
-    # Sort survivors by deadline (most urgent first)
-    sorted_survivors = sorted(survivors, key=lambda s: s.get('deadline', 999))
-    
-    formatted = []
-    for survivor in sorted_survivors:
-        deadline = survivor.get('deadline', 'unknown')
-        urgency = "🚨 URGENT" if deadline < 50 else "⚠️ WARNING" if deadline < 100 else "✅ SAFE"
-        formatted.append(f"- Survivor {survivor['id']} at {survivor['pos']}, deadline: {deadline} ({urgency})")
-    
-    return "\n".join(formatted)
-
-def format_hospitals(hospitals):
-    """Format hospitals list for the prompt - handles any data structure"""
-    if not hospitals:
-        return "None"
-    
-    formatted = []
-    for hospital in hospitals:
-        pos = hospital.get('pos', 'unknown')
-        
-        # Safely get all values with fallbacks
-        capacity = hospital.get('capacity', 'unknown')
-        
-        # Handle patients count
-        patients_data = hospital.get('patients', 0)
-        if hasattr(patients_data, '__len__') and not isinstance(patients_data, (str, int, float)):
-            patients_count = len(patients_data)
-        else:
-            try:
-                patients_count = int(patients_data)
-            except (ValueError, TypeError):
-                patients_count = 0
-        
-        # Handle queue count
-        queue_data = hospital.get('queue', 0)
-        if hasattr(queue_data, '__len__') and not isinstance(queue_data, (str, int, float)):
-            queue_count = len(queue_data)
-        else:
-            try:
-                queue_count = int(queue_data)
-            except (ValueError, TypeError):
-                queue_count = 0
-        
-        formatted.append(f"- Hospital at {pos}, capacity: {capacity}, patients: {patients_count}, queue: {queue_count}")
-    
-    return "\n".join(formatted)
-
-def format_fires(fires):
-    """Format fires list for the prompt"""
-    if not fires:
-        return "None"
-    
-    formatted = []
-    for fire in fires:
-        formatted.append(f"- Fire at {fire}")
-    
-    return "\n".join(formatted)
-
-def format_rubble(rubble):
-    """Format rubble list for the prompt"""
-    if not rubble:
-        return "None"
-    
-    formatted = []
-    for rub in rubble:
-        formatted.append(f"- Rubble at {rub}")
-    
-    return "\n".join(formatted)
\ No newline at end of file
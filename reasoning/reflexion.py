@@ -1,34 +1,31 @@
 # reasoning/reflexion.py
-import os, json
+import os, json, atexit
 from .llm_client import llm_complete
-from .schema_validator import enforce_assignment_schema, create_schema_enforcement_prompt, create_fallback_plan
+from .schema_validator import (enforce_assignment_schema, create_schema_enforcement_prompt, create_fallback_plan,
+                               fix_common_schema_errors, validate_assignment_schema)
+from .critique_cache import CritiqueCache
+from ._format import format_agents, format_survivors
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
 
 MEM_PATH = "memory.json"
 
-def make_reflexion_plan(context, strategy: str = "reflexion", scratchpad: str = ""):
-    """
-    Entry point used by planner.make_plan(...):
-      returns dict with commands
-    """
-    return reflexion_with_memory(context, scratchpad)
+# Rules memory is kept in-process and written to MEM_PATH every
+# _FLUSH_EVERY updates and whenever an episode ends (flush_rules), not on
+# every tick. The atexit hook is only a backstop: it does not run in
+# multiprocessing workers.
+_FLUSH_EVERY = 50
+_memory_cache = None
+_dirty = False
+_updates_since_flush = 0
+_critique_cache = CritiqueCache(os.path.join(os.path.dirname(MEM_PATH), "critique_memory.json"))
 
-def reflexion_with_memory(context: dict, scratchpad: str = "") -> dict:
-    """
-    Reflexion reasoning framework with memory and critique.
-    
-    This approach:
-    1. Loads previous rules and critiques from memory
-    2. Generates a plan considering past mistakes
-    3. Critiques the current plan
-    4. Updates memory with new insights
-    """
-    
-    # Load previous rules and critiques
-    memory = load_rules()
-    previous_rules = memory.get("rules", [])
-    
-    # Build the prompt incorporating memory
-    system_prompt = """You are a crisis response coordinator using Reflexion reasoning. 
+_SYSTEM_PROMPT = """You are a crisis response coordinator using Reflexion reasoning. 
     
 Your task is to analyze the crisis situation, learn from previous mistakes, and generate an improved response plan.
 
@@ -68,6 +65,32 @@ IMPORTANT:
 - Coordinates must be within the grid bounds
 - Learn from previous mistakes and apply improved strategies"""
 
+# Static prefix, built once and sent as the system message so it stays
+# byte-identical across calls (provider prompt caching keys on it)
+_SYSTEM_PREFIX = _SYSTEM_PROMPT + "\n\n" + create_schema_enforcement_prompt()
+
+def make_reflexion_plan(context, strategy: str = "reflexion", scratchpad: str = ""):
+    """
+    Entry point used by planner.make_plan(...):
+      returns dict with commands
+    """
+    return reflexion_with_memory(context, scratchpad)
+
+def reflexion_with_memory(context: dict, scratchpad: str = "") -> dict:
+    """
+    Reflexion reasoning framework with memory and critique.
+    
+    This approach:
+    1. Loads previous rules and critiques from memory
+    2. Generates a plan considering past mistakes
+    3. Critiques the current plan
+    4. Updates memory with new insights
+    """
+    
+    # Load previous rules and critiques
+    memory = load_rules()
+    previous_rules = memory.get("rules", [])
+    
     # Create the user prompt with current context and memory
     user_prompt = f"""Current crisis situation:
 
@@ -89,12 +112,9 @@ PREVIOUS RULES AND CRITIQUES:
 
 Now generate an improved plan considering past mistakes and applying learned rules:"""
 
-    # Add schema enforcement to prompt
-    full_prompt = system_prompt + "\n\n" + create_schema_enforcement_prompt() + "\n\n" + user_prompt
-    
     # Get LLM response
     try:
-        response = llm_complete(full_prompt, temperature=0.1)
+        response = llm_complete(user_prompt, temperature=0.1, system=_SYSTEM_PREFIX)
         
         # Use assignment schema validation
         plan, is_valid, error_msg = enforce_assignment_schema(response)
@@ -107,10 +127,20 @@ Now generate an improved plan considering past mistakes and applying learned rul
             return plan
         else:
             print(f"❌ Reflexion: Invalid JSON schema: {error_msg}")
+            
+            # Salvage recoverable schema errors locally before paying for a retry
+            if plan is not None:
+                fixed = fix_common_schema_errors(plan)
+                if fixed["commands"] and validate_assignment_schema(fixed)[0]:
+                    print(f"✅ Reflexion: Repaired plan to {len(fixed['commands'])} valid commands")
+                    critique = critique_plan(context, fixed, scratchpad)
+                    update_memory(memory, critique)
+                    return fixed
+            
             # Try one retry with schema reminder
-            retry_prompt = full_prompt + f"\n\nPREVIOUS RESPONSE WAS INVALID: {error_msg}\n\nPlease output ONLY valid JSON matching the exact schema above."
+            retry_prompt = user_prompt + f"\n\nPREVIOUS RESPONSE WAS INVALID: {error_msg}\n\nPlease output ONLY valid JSON matching the exact schema in the instructions."
             
-            retry_response = llm_complete(retry_prompt, temperature=0.1)
+            retry_response = llm_complete(retry_prompt, temperature=0.1, system=_SYSTEM_PREFIX)
             retry_plan, retry_valid, retry_error = enforce_assignment_schema(retry_response)
             
             if retry_valid and retry_plan:
@@ -126,9 +156,31 @@ Now generate an improved plan considering past mistakes and applying learned rul
         print(f"Error in Reflexion planning: {e}")
         return create_fallback_plan()
 
+def _dumps_indented(obj) -> str:
+    """Indented JSON for the memory file; orjson when it can encode obj."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2)
+
+def _dumps_compact(obj) -> str:
+    """Whitespace-free JSON for prompts, where indentation only costs tokens."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(',', ':'))
+
 def critique_plan(context: dict, plan: dict, scratchpad: str) -> str:
     """Critique the generated plan and suggest improvements."""
     
+    cached = _critique_cache.get(context, plan)
+    if cached is not None:
+        return cached
+    
     critique_prompt = """As a crisis response critic, analyze this plan and identify potential issues.
 
 CURRENT SITUATION:
@@ -148,25 +200,29 @@ Output your critique as clear, actionable feedback:"""
     try:
         critique = llm_complete(
             critique_prompt.format(
-                context=json.dumps(context, indent=2),
-                plan=json.dumps(plan, indent=2),
+                context=_dumps_compact(context),
+                plan=_dumps_compact(plan),
                 scratchpad=scratchpad if scratchpad else "None"
             ),
             temperature=0.2
         )
+        _critique_cache.put(context, plan, critique)
         return critique
     except Exception as e:
         return f"Plan critique failed: {e}"
 
 def load_rules():
-    """Load previous rules and critiques from memory file."""
-    if os.path.exists(MEM_PATH):
-        try:
-            with open(MEM_PATH, "r") as f:
-                return json.load(f)
-        except Exception:
-            return {"rules": []}
-    return {"rules": []}
+    """Load previous rules and critiques, reading the memory file only once."""
+    global _memory_cache
+    if _memory_cache is None:
+        _memory_cache = {"rules": []}
+        if os.path.exists(MEM_PATH):
+            try:
+                with open(MEM_PATH, "rb") as f:
+                    _memory_cache = _loads(f.read())
+            except Exception:
+                pass
+    return _memory_cache
 
 def update_memory(memory: dict, new_critique: str):
     """Update memory with new critique and save to file."""
@@ -176,45 +232,36 @@ def update_memory(memory: dict, new_critique: str):
     save_rules(memory)
 
 def save_rules(mem):
-    """Save memory to file."""
+    """Buffer memory for saving; the file is written every _FLUSH_EVERY calls and by flush_rules."""
+    global _memory_cache, _dirty, _updates_since_flush
+    _memory_cache = mem
+    _dirty = True
+    _updates_since_flush += 1
+    if _updates_since_flush >= _FLUSH_EVERY:
+        flush_rules()
+
+@atexit.register
+def flush_rules():
+    """
+    Write buffered memory to file if it changed since the last write.
+    
+    Call at the end of every episode. The in-process copy is dropped once
+    written, so the next load_rules() sees the file as it is on disk. The
+    critique cache is flushed along with it.
+    """
+    global _memory_cache, _dirty, _updates_since_flush
+    _critique_cache.flush()
+    if not _dirty:
+        return
     try:
         with open(MEM_PATH, "w") as f:
-            json.dump(mem, f, indent=2)
+            f.write(_dumps_indented(_memory_cache))
+        _memory_cache = None
+        _dirty = False
+        _updates_since_flush = 0
     except Exception as e:
         print(f"Error saving memory: {e}")
 
-def format_agents(agents):
-    """Format agents list for the prompt"""
-    if not agents:
-        return "None"
-    
-    formatted = []
-    for agent in agents:
-        agent_str = f"- {agent['kind']} (ID: {agent['id']}) at {agent['pos']}"
-        if agent.get('battery') is not None:
-            agent_str += f", battery: {agent['battery']}"
-        if agent.get('water') is not None:
-            agent_str += f", water: {agent['water']}"
-        if agent.get('tools') is not None:
-            agent_str += f", tools: {agent['tools']}"
-        if agent.get('carrying'):
-            agent_str += ", carrying survivor"
-        formatted.append(agent_str)
-    
-    return "\n".join(formatted)
-
-def format_survivors(survivors):
-    """Format survivors list for the prompt"""
-    if not survivors:
-        return "None"
-    
-    formatted = []
-    for survivor in survivors:
-        deadline = survivor.get('deadline', 'unknown')
-        formatted.append(f"- Survivor {survivor['id']} at {survivor['pos']}, deadline: {deadline}")
-    
-    return "\n".join(formatted)
-
 def format_memory(rules):
     """Format memory rules for the prompt"""
     if not rules:
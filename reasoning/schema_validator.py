@@ -18,6 +18,22 @@ The assignment specifies exact JSON format that all planners must output:
 import json
 from typing import Dict, List, Any, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+# Full-document parser for LLM output; orjson when available
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Parses the first object out of text with trailing prose
+_decoder = json.JSONDecoder()
+
 # Valid action names as specified in the assignment
 VALID_ACTION_NAMES = {
     "pickup_survivor",
@@ -31,6 +47,91 @@ VALID_ACTION_NAMES = {
 # Valid command types
 VALID_COMMAND_TYPES = {"move", "act"}
 
+# The same schema in the OpenAPI subset accepted by Gemini's response_schema,
+# so constrained decoding can only produce well-formed commands
+COMMANDS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "commands": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "agent_id": {"type": "string"},
+                    "type": {"type": "string", "enum": sorted(VALID_COMMAND_TYPES)},
+                    "to": {"type": "array", "items": {"type": "integer"}},
+                    "action_name": {"type": "string", "enum": sorted(VALID_ACTION_NAMES)}
+                },
+                "required": ["agent_id", "type"]
+            }
+        }
+    },
+    "required": ["commands"]
+}
+
+# Draft-7 JSON Schema equivalent of the checks in validate_assignment_schema
+ASSIGNMENT_SCHEMA = {
+    "type": "object",
+    "required": ["commands"],
+    "properties": {
+        "commands": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["agent_id", "type"],
+                "properties": {
+                    "agent_id": {"type": ["string", "integer"]},
+                    "type": {"enum": sorted(VALID_COMMAND_TYPES)}
+                },
+                # if/then rather than oneOf so failures name the missing field
+                "allOf": [
+                    {
+                        "if": {"properties": {"type": {"const": "move"}}},
+                        "then": {
+                            "required": ["to"],
+                            "properties": {
+                                "to": {"type": "array", "items": {"type": "integer"}, "minItems": 2, "maxItems": 2}
+                            }
+                        }
+                    },
+                    {
+                        "if": {"properties": {"type": {"const": "act"}}},
+                        "then": {
+                            "required": ["action_name"],
+                            "properties": {"action_name": {"enum": sorted(VALID_ACTION_NAMES)}}
+                        }
+                    }
+                ]
+            }
+        }
+    }
+}
+
+# Compiled once at import; the hand-written checks below are the fallback
+_validator = fastjsonschema.compile(ASSIGNMENT_SCHEMA) if fastjsonschema is not None else None
+
+def _is_int(value) -> bool:
+    """A coordinate or id integer: an int, but not a bool."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _check_agent_id(i: int, agent_id) -> Optional[str]:
+    """Error for a command's 'agent_id', or None."""
+    if not (isinstance(agent_id, str) or _is_int(agent_id)):
+        return f"Command {i} 'agent_id' must be string or int"
+    return None
+
+def _check_move_target(i: int, to_pos) -> Optional[str]:
+    """
+    Error for a move command's 'to', or None. JSON Schema's "integer" also
+    admits 1.0 and fastjsonschema treats tuples as arrays, so both validator
+    paths run this and _check_agent_id to agree with each other.
+    """
+    if not isinstance(to_pos, list) or len(to_pos) != 2:
+        return f"Command {i} 'to' field must be list of 2 integers [x, y]"
+    if not all(_is_int(coord) for coord in to_pos):
+        return f"Command {i} 'to' coordinates must be integers"
+    return None
+
 def validate_assignment_schema(plan_dict: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Validate that a plan dictionary conforms to the assignment-specified JSON schema.
@@ -42,6 +143,19 @@ def validate_assignment_schema(plan_dict: Dict[str, Any]) -> Tuple[bool, str]:
         Tuple[bool, str]: (is_valid, error_message)
     """
     
+    if _validator is not None:
+        try:
+            _validator(plan_dict)
+        except fastjsonschema.JsonSchemaException as e:
+            return False, str(e)
+        for i, cmd in enumerate(plan_dict["commands"]):
+            error = _check_agent_id(i, cmd["agent_id"])
+            if error is None and cmd["type"] == "move":
+                error = _check_move_target(i, cmd["to"])
+            if error is not None:
+                return False, error
+        return True, "Valid"
+    
     # Check top-level structure
     if not isinstance(plan_dict, dict):
         return False, "Plan must be a dictionary"
@@ -66,9 +180,9 @@ def validate_assignment_schema(plan_dict: Dict[str, Any]) -> Tuple[bool, str]:
             return False, f"Command {i} missing required 'type' field"
         
         # Validate agent_id (should be string representation of number)
-        agent_id = cmd["agent_id"]
-        if not isinstance(agent_id, (str, int)):
-            return False, f"Command {i} 'agent_id' must be string or int"
+        error = _check_agent_id(i, cmd["agent_id"])
+        if error is not None:
+            return False, error
         
         # Validate type
         cmd_type = cmd["type"]
@@ -80,12 +194,9 @@ def validate_assignment_schema(plan_dict: Dict[str, Any]) -> Tuple[bool, str]:
             if "to" not in cmd:
                 return False, f"Command {i} with type 'move' missing 'to' field"
             
-            to_pos = cmd["to"]
-            if not isinstance(to_pos, list) or len(to_pos) != 2:
-                return False, f"Command {i} 'to' field must be list of 2 integers [x, y]"
-            
-            if not all(isinstance(coord, int) for coord in to_pos):
-                return False, f"Command {i} 'to' coordinates must be integers"
+            error = _check_move_target(i, cmd["to"])
+            if error is not None:
+                return False, error
         
         elif cmd_type == "act":
             if "action_name" not in cmd:
@@ -114,16 +225,24 @@ def enforce_assignment_schema(response_text: str) -> Tuple[Optional[Dict[str, An
     # Try to extract JSON from response
     try:
         # Look for JSON in the response
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
+        text = response_text.strip()
+        json_start = text.find('{')
         
-        if json_start == -1 or json_end <= json_start:
+        if json_start == -1:
             return None, False, "No JSON found in response"
         
-        json_str = response_text[json_start:json_end]
-        plan_dict = json.loads(json_str)
+        plan_dict = None
+        if json_start == 0 and text.endswith('}'):
+            # Bare JSON (provider JSON mode): one full-document parse
+            try:
+                plan_dict = _loads(text)
+            except ValueError:
+                pass
+        if plan_dict is None:
+            # Parse exactly one object and ignore whatever follows it
+            plan_dict, _ = _decoder.raw_decode(text, json_start)
         
-    except json.JSONDecodeError as e:
+    except ValueError as e:  # json.JSONDecodeError and orjson.JSONDecodeError
         return None, False, f"Invalid JSON: {e}"
     
     # Validate schema
@@ -131,10 +250,7 @@ def enforce_assignment_schema(response_text: str) -> Tuple[Optional[Dict[str, An
     
     return plan_dict, is_valid, error_msg
 
-def create_schema_enforcement_prompt() -> str:
-    """
-    Create a prompt section that enforces the assignment schema.
-    """
+def _build_schema_enforcement_prompt() -> str:
     return f"""
 REQUIRED JSON OUTPUT FORMAT (MUST MATCH EXACTLY):
 {{
@@ -159,11 +275,26 @@ VALIDATION RULES:
 CRITICAL: Output ONLY valid JSON, no additional text or explanation.
 """
 
+# Invariant, so built once; byte-identical text keeps provider prompt caches warm
+_SCHEMA_PROMPT = _build_schema_enforcement_prompt()
+
+def create_schema_enforcement_prompt() -> str:
+    """
+    Create a prompt section that enforces the assignment schema.
+    """
+    return _SCHEMA_PROMPT
+
+# Template for the empty plan; never hand this object out, callers mutate plans
+_FALLBACK = {"commands": []}
+
 def create_fallback_plan() -> Dict[str, Any]:
     """
     Create a valid empty plan that conforms to assignment schema.
+    
+    Every call returns a fresh dict and list, so appending to the result
+    cannot leak commands into later fallbacks.
     """
-    return {"commands": []}
+    return {"commands": list(_FALLBACK["commands"])}
 
 def fix_common_schema_errors(plan_dict: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -179,14 +310,15 @@ def fix_common_schema_errors(plan_dict: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(plan_dict, dict):
         return create_fallback_plan()
     
-    if "commands" not in plan_dict:
-        return create_fallback_plan()
-    
-    commands = plan_dict["commands"]
+    commands = plan_dict.get("commands")
     if not isinstance(commands, list):
         return create_fallback_plan()
     
+    # Locals: one fast lookup each instead of a global lookup per command
+    valid_types = VALID_COMMAND_TYPES
+    valid_actions = VALID_ACTION_NAMES
     fixed_commands = []
+    append = fixed_commands.append
     
     for cmd in commands:
         if not isinstance(cmd, dict):
@@ -199,25 +331,26 @@ def fix_common_schema_errors(plan_dict: Dict[str, Any]) -> Dict[str, Any]:
             continue  # Skip commands without agent_id
         
         # Validate type
-        if "type" not in cmd or cmd["type"] not in VALID_COMMAND_TYPES:
+        cmd_type = cmd.get("type")
+        if cmd_type not in valid_types:
             continue  # Skip invalid commands
         
         # Fix type-specific issues
-        if cmd["type"] == "move":
-            if "to" not in cmd or not isinstance(cmd["to"], list) or len(cmd["to"]) != 2:
+        if cmd_type == "move":
+            to = cmd.get("to")
+            if not isinstance(to, list) or len(to) != 2:
                 continue  # Skip invalid move commands
             
             # Ensure coordinates are integers
             try:
-                cmd["to"] = [int(cmd["to"][0]), int(cmd["to"][1])]
-            except (ValueError, TypeError, IndexError):
+                cmd["to"] = [int(to[0]), int(to[1])]
+            except (ValueError, TypeError):
                 continue  # Skip if can't convert to integers
         
-        elif cmd["type"] == "act":
-            if "action_name" not in cmd or cmd["action_name"] not in VALID_ACTION_NAMES:
-                continue  # Skip invalid action commands
+        elif cmd.get("action_name") not in valid_actions:
+            continue  # Skip invalid action commands
         
-        fixed_commands.append(cmd)
+        append(cmd)
     
     return {"commands": fixed_commands}
 
@@ -0,0 +1,115 @@
+# reasoning/semantic_cache.py
+"""
+Disk-backed LLM response cache that survives across experiment reruns.
+
+Responses are stored in SQLite keyed by the exact request hash. When
+sentence-transformers is installed each prompt is also embedded, and a
+prompt with no exact match is answered by the stored response of the most
+similar earlier prompt (cosine similarity above the threshold) sent with
+the same system prompt, header and sampling settings within the same
+scenario (map and seed).
+
+The cache is opt-in: set SEMANTIC_CACHE=1 to use it. Otherwise every run
+asks the provider afresh and experiments stay independent of each other.
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+_DEFAULT_PATH = "llm_cache.sqlite"
+_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+_SIMILARITY_THRESHOLD = 0.95
+
+@functools.lru_cache(maxsize=1)
+def _get_embedder():
+    return SentenceTransformer(_EMBEDDING_MODEL)
+
+class SemanticCache:
+    """Prompt -> response store with exact and nearest-neighbour lookup."""
+    
+    def __init__(self, path: str, threshold: float = _SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "prompt_hash TEXT PRIMARY KEY, scope TEXT, embedding BLOB, response TEXT, ts REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+        self._conn.commit()
+        # scope -> (hashes, unit embedding matrix), loaded on first use
+        self._index = {}
+    
+    def _embed(self, prompt: str):
+        if SentenceTransformer is None:
+            return None
+        return _get_embedder().encode(prompt, normalize_embeddings=True).astype(np.float32)
+    
+    def _scope_index(self, scope: str):
+        index = self._index.get(scope)
+        if index is None:
+            rows = self._conn.execute(
+                "SELECT prompt_hash, embedding FROM responses WHERE scope = ? AND embedding IS NOT NULL", (scope,)
+            ).fetchall()
+            hashes = [h for h, _ in rows]
+            vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) if rows else None
+            index = self._index[scope] = (hashes, vectors)
+        return index
+    
+    def lookup(self, prompt_hash: str, scope: str, prompt: str) -> Optional[str]:
+        """Stored response for this request or, failing that, for the most similar prompt in scope."""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE prompt_hash = ?", (prompt_hash,)).fetchone()
+            if row is not None:
+                return row[0]
+            
+            embedding = self._embed(prompt)
+            if embedding is None:
+                return None
+            hashes, vectors = self._scope_index(scope)
+            if vectors is None:
+                return None
+            similarities = vectors @ embedding
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+            row = self._conn.execute("SELECT response FROM responses WHERE prompt_hash = ?", (hashes[best],)).fetchone()
+            return row[0] if row else None
+    
+    def store(self, prompt_hash: str, scope: str, prompt: str, response: str):
+        """Persist response (and the prompt's embedding, when available)."""
+        with self._lock:
+            embedding = self._embed(prompt)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (prompt_hash, scope, embedding.tobytes() if embedding is not None else None, response, time.time())
+            )
+            self._conn.commit()
+            if embedding is not None and scope in self._index:
+                hashes, vectors = self._index[scope]
+                if prompt_hash not in hashes:
+                    hashes.append(prompt_hash)
+                    vectors = embedding[None, :] if vectors is None else np.vstack([vectors, embedding])
+                    self._index[scope] = (hashes, vectors)
+
+@functools.lru_cache(maxsize=1)
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide cache at SEMANTIC_CACHE_PATH (default llm_cache.sqlite) when SEMANTIC_CACHE is set, else None."""
+    if not os.getenv("SEMANTIC_CACHE") or os.getenv("CACHE_DISABLE"):
+        return None
+    try:
+        return SemanticCache(os.getenv("SEMANTIC_CACHE_PATH", _DEFAULT_PATH))
+    except sqlite3.Error as e:
+        print(f"Warning: semantic cache unavailable: {e}")
+        return None
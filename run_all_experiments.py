@@ -7,14 +7,28 @@ This script executes the full experimental pipeline:
 3. Generate plots
 """
 
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from eval.harness import run_experiment_batch
+from eval.harness import run_experiment, save_results
 from eval.aggregate_results import aggregate_results
 from eval.plots import create_required_plots
 
+# Strategies that read and write shared on-disk memory (memory.json and the
+# critique cache). Their runs go through a single worker, one after another,
+# so every run sees the previous run's memory and no write is lost.
+_SERIAL_STRATEGIES = {"reflexion"}
+
+def _run_one(map_path, strategy, seed, max_ticks=300):
+    """Run and save one experiment in a worker process; returns its metrics."""
+    results = run_experiment(map_path, strategy, seed, max_ticks)
+    save_results(results)
+    # Only the metrics travel back to the parent; the transcript is on disk
+    return {k: v for k, v in results.items() if k != 'transcript' and not k.startswith('_')}
+
 def main():
     print("🚀 Starting CrisisSim Experiments")
     print("=" * 50)
@@ -44,12 +58,25 @@ def main():
     
     # Step 1: Run batch experiments
     print("🔬 Step 1: Running batch experiments...")
-    try:
-        results = run_experiment_batch(maps, strategies, seeds, max_ticks=300)
-        print(f"✅ Completed {len(results)} experiments successfully")
-    except Exception as e:
-        print(f"❌ Error in batch experiments: {e}")
-        return
+    results = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor, \
+            ProcessPoolExecutor(max_workers=1) as serial_executor:
+        futures = {
+            (serial_executor if s in _SERIAL_STRATEGIES else executor).submit(_run_one, m, s, seed, 300):
+                (Path(m).stem, s, seed)
+            for m in maps for s in strategies for seed in seeds
+        }
+        for future in as_completed(futures):
+            map_name, strategy, seed = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                print(f"  ❌ {map_name}/{strategy}/seed {seed}: {e}")
+                continue
+            results.append(summary)
+            print(f"  ✅ {map_name}/{strategy}/seed {seed}: {summary['rescued']} rescued, {summary['deaths']} deaths")
+    
+    print(f"✅ Completed {len(results)} experiments successfully")
     
     # Step 2: Aggregate results
     print("\n📊 Step 2: Aggregating results...")
@@ -9,6 +9,11 @@ import websockets
 import json
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Store connected clients
 _clients = set()
 
@@ -25,11 +30,10 @@ async def handler(websocket):
 async def push_state(state_data):
     """Push state to all connected clients."""
     if _clients:
-        message = json.dumps(state_data)
-        await asyncio.gather(
-            *[client.send(message) for client in _clients],
-            return_exceptions=True
-        )
+        # Serialize once; str keeps these text frames (the page JSON.parses event.data)
+        message = orjson.dumps(state_data).decode() if orjson is not None else json.dumps(state_data)
+        # Writes to every peer without a coroutine per client; failed peers are skipped
+        websockets.broadcast(_clients, message)
 
 async def main():
     """Start WebSocket server."""
@@ -0,0 +1,40 @@
+"""
+Compiled per-tick resource update for ResourcePool.
+
+With numba installed, consume_all drains battery, water and tools for the
+whole fleet in one pass over the pool arrays; otherwise consume_all is None
+and ResourcePool falls back to masked NumPy updates.
+"""
+
+import numpy as np
+
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+if nb is not None:
+    @nb.njit(cache=True)
+    def consume_all(battery, water, tools, has_battery, has_water, has_tools, dbat, dwater, dtools):
+        """
+        Subtract dbat/dwater/dtools from every agent holding that resource, in
+        place; returns a bool mask of agents with no resource run dry.
+        """
+        n = battery.shape[0]
+        alive = np.ones(n, dtype=np.bool_)
+        for i in range(n):
+            if has_battery[i]:
+                battery[i] -= dbat
+                if battery[i] <= 0:
+                    alive[i] = False
+            if has_water[i]:
+                water[i] -= dwater
+                if water[i] <= 0:
+                    alive[i] = False
+            if has_tools[i]:
+                tools[i] -= dtools
+                if tools[i] <= 0:
+                    alive[i] = False
+        return alive
+else:
+    consume_all = None
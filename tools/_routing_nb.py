@@ -0,0 +1,78 @@
+"""
+Compiled grid BFS for Router.
+
+With numba installed, bfs_grid runs the search over a dense uint8 obstacle
+grid, copied into a flat array with a ring of blocked cells so neighbours
+need no bounds checks, with a preallocated queue and an int32 parent
+array; otherwise bfs_grid is None and Router keeps its pure-Python search.
+"""
+
+import numpy as np
+
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+if nb is not None:
+    @nb.njit(cache=True)
+    def bfs_grid(obs, sx, sy, gx, gy):
+        """
+        Shortest path from (sx, sy) to (gx, gy) on obs (shape (height, width),
+        nonzero = blocked) as an (L, 2) int32 array of x, y rows; empty if none.
+        Neighbours are tried in Router.bfs order, so the same path is returned.
+        """
+        height, width = obs.shape
+        if obs[gy, gx] and (sx != gx or sy != gy):
+            return np.empty((0, 2), dtype=np.int32)  # Goal is an obstacle
+        # Cell (x, y) is at (y + 1) * row + x + 1 inside a ring of blocked
+        # cells, so a neighbour check is one load with no bounds tests
+        row = width + 2
+        seen = np.ones(row * (height + 2), dtype=np.uint8)
+        for y in range(height):
+            for x in range(width):
+                seen[(y + 1) * row + x + 1] = 1 if obs[y, x] else 0
+        parent = np.empty(row * (height + 2), dtype=np.int32)
+        queue = np.empty(width * height, dtype=np.int32)
+        deltas = (row, 1, -row, -1)
+        start = (sy + 1) * row + sx + 1
+        goal = (gy + 1) * row + gx + 1
+        seen[start] = 1
+        parent[start] = start
+        queue[0] = start
+        head = 0
+        tail = 1
+        found = start == goal
+
+        while head < tail and not found:
+            node = queue[head]
+            head += 1
+            for k in range(4):
+                neighbor = node + deltas[k]
+                if seen[neighbor]:
+                    continue
+                seen[neighbor] = 1
+                parent[neighbor] = node
+                queue[tail] = neighbor
+                tail += 1
+                if neighbor == goal:
+                    found = True
+                    break
+
+        if not found:
+            return np.empty((0, 2), dtype=np.int32)
+
+        length = 1
+        node = goal
+        while node != start:
+            node = parent[node]
+            length += 1
+        path = np.empty((length, 2), dtype=np.int32)
+        node = goal
+        for i in range(length - 1, -1, -1):
+            path[i, 0] = node % row - 1
+            path[i, 1] = node // row - 1
+            node = parent[node]
+        return path
+else:
+    bfs_grid = None
@@ -3,19 +3,49 @@
 Hospital triage system with capacity limits and queue management.
 """
 
-from typing import List, Dict, Any
+import heapq
+import itertools
+from typing import List, Dict, Any, Optional
 from collections import deque
 
 class Hospital:
     """Hospital with limited capacity and triage system."""
     
-    def __init__(self, pos: List[int], capacity: int = 3, triage_policy: str = "fifo"):
+    def __init__(self, pos: List[int], capacity: int = 3, triage_policy: str = "fifo",
+                 w_u: float = 1.0, w_c: float = 1.0, max_queue: Optional[int] = None):
+        """
+        triage_policy picks who leaves the queue first: "fifo" (arrival
+        order), "deadline" (lowest deadline) or "weighted" (highest score(),
+        with w_u weighting urgency and w_c cost of care).
+        
+        max_queue bounds the waiting queue; past it the lowest-priority
+        waiter is dropped and counted in dropped_count. None leaves the
+        queue unbounded.
+        """
         self.pos = pos
         self.capacity = capacity
         self.triage_policy = triage_policy
-        self.queue = deque()
-        self.patients = []
+        self.w_u = w_u
+        self.w_c = w_c
+        # FIFO: a deque of patients. Otherwise a private heap of (priority,
+        # arrival, patient), so the highest-priority waiter pops first and
+        # equal priorities keep arrival order. queue is a read-only snapshot;
+        # change the waiting list through enqueue() and remove_waiting().
+        self._heap = [] if triage_policy in ("deadline", "weighted") else None
+        self._fifo = deque() if self._heap is None else None
+        self._arrivals = itertools.count()
+        self.patients = deque()
+        self.max_queue = max_queue
+        self.overflow_count = 0
+        self.dropped_count = 0
         
+    @property
+    def queue(self) -> tuple:
+        """Snapshot of the waiting patients in the order they will be admitted."""
+        if self._heap is None:
+            return tuple(self._fifo)
+        return tuple(patient for _, _, patient in sorted(self._heap))
+    
     def admit_patient(self, survivor: Dict[str, Any]) -> bool:
         """Attempt to admit a patient to the hospital."""
         if len(self.patients) < self.capacity:
@@ -23,39 +53,90 @@ class Hospital:
             return True
         
         # Add to queue if hospital is full
-        self.queue.append(survivor)
+        self.overflow_count += 1
+        self.enqueue(survivor)
+        return False
+    
+    def enqueue(self, survivor: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Add survivor to the waiting queue according to the triage policy.
+        
+        Returns the waiter dropped to keep the queue within max_queue (possibly
+        survivor itself), or None when nobody was dropped.
+        """
+        if self.triage_policy == "deadline":
+            heapq.heappush(self._heap, (survivor.get('deadline', float('inf')), next(self._arrivals), survivor))
+        elif self.triage_policy == "weighted":
+            heapq.heappush(self._heap, (-self.score(survivor), next(self._arrivals), survivor))
+        else:
+            self._fifo.append(survivor)
+        
+        if self.max_queue is not None and self.get_queue_length() > self.max_queue:
+            if self._heap is None:
+                dropped = self._fifo.pop()  # FIFO: the latest arrival ranks last
+            else:
+                # Worst entry is a leaf somewhere in the heap; the queue is bounded, so O(n) is fine
+                worst = max(self._heap)
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                dropped = worst[2]
+            self.dropped_count += 1
+            return dropped
+        return None
+    
+    def remove_waiting(self, survivor: Dict[str, Any]) -> bool:
+        """Take survivor out of the waiting queue; False if it was not waiting."""
+        if self._heap is None:
+            for i, patient in enumerate(self._fifo):
+                if patient is survivor:
+                    del self._fifo[i]
+                    return True
+            return False
+        for i, (_, _, patient) in enumerate(self._heap):
+            if patient is survivor:
+                self._heap[i] = self._heap[-1]
+                self._heap.pop()
+                heapq.heapify(self._heap)
+                return True
         return False
     
+    def score(self, patient: Dict[str, Any]) -> float:
+        """Weighted triage priority: urgency (1/deadline) plus cost of care (1/(severity+1))."""
+        return self.w_u / max(patient.get('deadline', float('inf')), 1) + self.w_c / (patient.get('severity', 1) + 1)
+    
     def discharge_patient(self) -> Dict[str, Any]:
         """Discharge a patient (when rescued)."""
-        if self.patients:
-            return self.patients.pop(0)
-        return None
+        return self.patients.popleft() if self.patients else None
     
     def process_queue(self) -> None:
         """Process the waiting queue."""
-        while self.queue and len(self.patients) < self.capacity:
+        waiting = self._fifo if self._heap is None else self._heap
+        while waiting and len(self.patients) < self.capacity:
             # Get next patient based on triage policy
-            if self.triage_policy == "deadline":
-                # Find patient with lowest deadline
-                min_deadline_idx = 0
-                for i, patient in enumerate(self.queue):
-                    if patient.get('deadline', float('inf')) < self.queue[min_deadline_idx].get('deadline', float('inf')):
-                        min_deadline_idx = i
-                
-                # Move to hospital
-                patient = self.queue[min_deadline_idx]
-                del self.queue[min_deadline_idx]
-                self.patients.append(patient)
+            if self._heap is not None:
+                # Patient with lowest deadline / highest score
+                _, _, patient = heapq.heappop(self._heap)
             else:  # FIFO
-                patient = self.queue.popleft()
-                self.patients.append(patient)
+                patient = self._fifo.popleft()
+            self.patients.append(patient)
+    
+    def to_context(self) -> Dict[str, Any]:
+        """Hospital entry for the planner context, with counts precomputed."""
+        return {
+            "pos": self.pos,
+            "capacity": self.capacity,
+            "patients_count": len(self.patients),
+            "queue_len": self.get_queue_length()
+        }
     
     def get_queue_length(self) -> int:
         """Get the current queue length."""
-        return len(self.queue)
+        return len(self._fifo if self._heap is None else self._heap)
     
     def get_overflow_events(self) -> int:
-        """Count how many patients were turned away due to overflow."""
-        # This would need to be tracked separately
-        return 0
\ No newline at end of file
+        """Count how many patients arrived to a full hospital and had to queue."""
+        return self.overflow_count
+    
+    def get_dropped_count(self) -> int:
+        """Count how many waiting patients were dropped because the queue was full."""
+        return self.dropped_count
\ No newline at end of file
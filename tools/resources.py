@@ -3,11 +3,39 @@
 Resource management for agents (battery, water, tools).
 """
 
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from ._resources_nb import consume_all as _consume_all_nb
 
 class ResourceManager:
     """Manage agent resources like battery, water, and tools."""
     
+    @staticmethod
+    def tag_agent(agent: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Precompute the truck-only resource flags on an agent dict.
+        
+        Call once when the agent is created; the water/tools methods then
+        read one boolean instead of comparing kind and probing for the key
+        on every call. The flags are a snapshot: re-tag the agent if its
+        kind changes or it gains or loses water or tools. Untagged agents
+        are checked directly on every call and are never modified.
+        """
+        is_truck = agent.get('kind') == 'truck'
+        agent['is_truck'] = is_truck
+        agent['can_consume_water'] = is_truck and 'water' in agent
+        agent['can_consume_tools'] = is_truck and 'tools' in agent
+        return agent
+    
+    @staticmethod
+    def _can_consume(agent: Dict[str, Any], resource: str) -> bool:
+        can = agent.get('can_consume_' + resource)
+        if can is None:
+            can = agent.get('kind') == 'truck' and resource in agent
+        return can
+    
     @staticmethod
     def consume_battery(agent: Dict[str, Any], amount: int = 1) -> bool:
         """Consume battery from an agent."""
@@ -20,7 +48,7 @@ class ResourceManager:
     @staticmethod
     def consume_water(agent: Dict[str, Any], amount: int = 1) -> bool:
         """Consume water from a truck."""
-        if agent.get('kind') != 'truck' or 'water' not in agent:
+        if not ResourceManager._can_consume(agent, 'water'):
             return True
             
         agent['water'] -= amount
@@ -29,7 +57,7 @@ class ResourceManager:
     @staticmethod
     def consume_tools(agent: Dict[str, Any], amount: int = 1) -> bool:
         """Consume tools from a truck."""
-        if agent.get('kind') != 'truck' or 'tools' not in agent:
+        if not ResourceManager._can_consume(agent, 'tools'):
             return True
             
         agent['tools'] -= amount
@@ -48,7 +76,7 @@ class ResourceManager:
     @staticmethod
     def resupply_water(agent: Dict[str, Any]) -> bool:
         """Resupply water for trucks."""
-        if agent.get('kind') != 'truck' or 'water' not in agent:
+        if not ResourceManager._can_consume(agent, 'water'):
             return False
             
         max_water = agent.get('max_water', 5)
@@ -58,9 +86,130 @@ class ResourceManager:
     @staticmethod
     def resupply_tools(agent: Dict[str, Any]) -> bool:
         """Resupply tools for trucks."""
-        if agent.get('kind') != 'truck' or 'tools' not in agent:
+        if not ResourceManager._can_consume(agent, 'tools'):
             return False
             
         max_tools = agent.get('max_tools', 3)
         agent['tools'] = max_tools
-        return True
\ No newline at end of file
+        return True
+
+class ResourcePool:
+    """
+    Structure-of-arrays copy of a fleet's resources for whole-fleet updates.
+    
+    Battery, water and tools live in parallel int32 arrays indexed by agent,
+    so one NumPy operation updates every agent instead of one dict update
+    per agent. Agents without a resource are masked out, matching the no-op
+    cases of ResourceManager. Call sync_to() to write the values back into
+    the agent dicts.
+    """
+    
+    def __init__(self, agents: Iterable[Dict[str, Any]]):
+        agents = list(agents)
+        self.ids: List[str] = [str(a['id']) for a in agents]
+        self._index = {agent_id: i for i, agent_id in enumerate(self.ids)}
+        
+        self.kind_is_truck = np.array(
+            [a.get('is_truck', a.get('kind') == 'truck') for a in agents], dtype=bool
+        )
+        self.has_battery = np.array(['battery' in a for a in agents], dtype=bool)
+        self.has_water = np.array([ResourceManager._can_consume(a, 'water') for a in agents], dtype=bool)
+        self.has_tools = np.array([ResourceManager._can_consume(a, 'tools') for a in agents], dtype=bool)
+        
+        self.battery = np.array([a.get('battery', 0) for a in agents], dtype=np.int32)
+        self.water = np.array([a.get('water', 0) for a in agents], dtype=np.int32)
+        self.tools = np.array([a.get('tools', 0) for a in agents], dtype=np.int32)
+        self.max_battery = np.array([a.get('max_battery', 100) for a in agents], dtype=np.int32)
+        self.max_water = np.array([a.get('max_water', 5) for a in agents], dtype=np.int32)
+        self.max_tools = np.array([a.get('max_tools', 3) for a in agents], dtype=np.int32)
+    
+    def consume_battery_all(self, amount: int = 1) -> np.ndarray:
+        """Drain every battery by amount; returns which agents can still act."""
+        self.battery[self.has_battery] -= amount
+        return ~self.has_battery | (self.battery > 0)
+    
+    def consume_water_all(self, amount: int = 1) -> np.ndarray:
+        """Drain every truck's water by amount; returns which agents still have water (or need none)."""
+        self.water[self.has_water] -= amount
+        return ~self.has_water | (self.water > 0)
+    
+    def consume_tools_all(self, amount: int = 1) -> np.ndarray:
+        """Drain every truck's tools by amount; returns which agents still have tools (or need none)."""
+        self.tools[self.has_tools] -= amount
+        return ~self.has_tools | (self.tools > 0)
+    
+    def consume_all(self, battery: int = 1, water: int = 0, tools: int = 0) -> np.ndarray:
+        """
+        One tick's battery, water and tools drain for the whole fleet.
+        
+        Returns which agents still have every resource they hold above zero.
+        Runs as a single compiled loop when numba is available.
+        """
+        if _consume_all_nb is not None:
+            return _consume_all_nb(
+                self.battery, self.water, self.tools,
+                self.has_battery, self.has_water, self.has_tools,
+                battery, water, tools
+            )
+        return self.consume_battery_all(battery) & self.consume_water_all(water) & self.consume_tools_all(tools)
+    
+    def consume_battery(self, agent_id, amount: int = 1) -> bool:
+        """Per-agent ResourceManager.consume_battery against the pool."""
+        i = self._index[str(agent_id)]
+        if not self.has_battery[i]:
+            return True
+        self.battery[i] -= amount
+        return bool(self.battery[i] > 0)
+    
+    def consume_water(self, agent_id, amount: int = 1) -> bool:
+        """Per-agent ResourceManager.consume_water against the pool."""
+        i = self._index[str(agent_id)]
+        if not self.has_water[i]:
+            return True
+        self.water[i] -= amount
+        return bool(self.water[i] > 0)
+    
+    def consume_tools(self, agent_id, amount: int = 1) -> bool:
+        """Per-agent ResourceManager.consume_tools against the pool."""
+        i = self._index[str(agent_id)]
+        if not self.has_tools[i]:
+            return True
+        self.tools[i] -= amount
+        return bool(self.tools[i] > 0)
+    
+    def recharge_battery(self, agent_id) -> bool:
+        """Per-agent ResourceManager.recharge_battery against the pool."""
+        i = self._index[str(agent_id)]
+        if not self.has_battery[i]:
+            return False
+        self.battery[i] = self.max_battery[i]
+        return True
+    
+    def resupply_water(self, agent_id) -> bool:
+        """Per-agent ResourceManager.resupply_water against the pool."""
+        i = self._index[str(agent_id)]
+        if not self.has_water[i]:
+            return False
+        self.water[i] = self.max_water[i]
+        return True
+    
+    def resupply_tools(self, agent_id) -> bool:
+        """Per-agent ResourceManager.resupply_tools against the pool."""
+        i = self._index[str(agent_id)]
+        if not self.has_tools[i]:
+            return False
+        self.tools[i] = self.max_tools[i]
+        return True
+    
+    def sync_to(self, agents: Iterable[Dict[str, Any]]):
+        """Write pooled values back into the agent dicts (matched by id)."""
+        for agent in agents:
+            i = self._index.get(str(agent['id']))
+            if i is None:
+                continue
+            if self.has_battery[i]:
+                agent['battery'] = int(self.battery[i])
+            if self.has_water[i]:
+                agent['water'] = int(self.water[i])
+            if self.has_tools[i]:
+                agent['tools'] = int(self.tools[i])
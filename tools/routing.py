@@ -3,52 +3,590 @@
 Routing utilities for pathfinding and navigation.
 """
 
-from typing import List, Tuple, Set
-from collections import deque
+import functools
+import heapq
+import itertools
+import threading
+from array import array
+from typing import Hashable, List, Optional, Tuple, Set, Union
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from ._routing_nb import bfs_grid
+
+# Path cache: (node, goal, width, height, obstacles key) -> (path, index of
+# node in path), the path kept as a flat array('i') of interleaved x, y.
+# Every node on a found path gets an entry, since the rest of a shortest
+# path is itself a shortest path from that node to the goal.
+_PATH_CACHE_MAXSIZE = 4096
+_path_cache = OrderedDict()
+_path_cache_lock = threading.Lock()
+
+def _path_cache_lookup(key, want: str = "full"):
+    with _path_cache_lock:
+        entry = _path_cache.get(key)
+        if entry is None:
+            return None
+        _path_cache.move_to_end(key)
+    path, i = entry
+    return _path_view(path, 2 * i, want, key[0])
+
+def _path_view(path: array, offset: int, want: str, start: Tuple[int, int]):
+    """The part of flat path from offset on, in the form asked for with want."""
+    if want == "first_step":
+        # The start itself when already at the goal or there is no path
+        return (path[offset + 2], path[offset + 3]) if offset + 2 < len(path) else start
+    if want == "array":
+        return path[offset:]
+    return _path_nodes(path[offset:])
+
+def _path_array(nodes) -> array:
+    """Path as a flat array('i') of interleaved x, y coordinates."""
+    return array('i', itertools.chain.from_iterable(nodes))
+
+def _path_nodes(path: array) -> List[Tuple[int, int]]:
+    """Flat array('i') path as a list of (x, y) tuples."""
+    return list(zip(path[0::2], path[1::2]))
+
+def _path_cache_store(start, goal, grid_key, path: array):
+    with _path_cache_lock:
+        _path_cache[(start, goal) + grid_key] = (path, 0)
+        for i in range(len(path) // 2):
+            _path_cache[((path[2 * i], path[2 * i + 1]), goal) + grid_key] = (path, i)
+        while len(_path_cache) > _PATH_CACHE_MAXSIZE:
+            _path_cache.popitem(last=False)
+
+# Flow field cache: (goals, width, height, obstacles key) -> direction field
+_FLOW_CACHE_MAXSIZE = 32
+_flow_cache = OrderedDict()
+_flow_cache_lock = threading.Lock()
+
+# Step directions, in Router.bfs neighbour order; flow fields store indices
+_DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+@functools.lru_cache(maxsize=8)
+def _obstacle_grid(width: int, height: int, obstacles: frozenset) -> np.ndarray:
+    """Dense (height, width) uint8 grid with obstacle cells set, for bfs_grid."""
+    grid = np.zeros((height, width), dtype=np.uint8)
+    for x, y in obstacles:
+        if 0 <= x < width and 0 <= y < height:
+            grid[y, x] = 1
+    return grid
+
+@functools.lru_cache(maxsize=8)
+def _free_degree(width: int, height: int, obstacles: frozenset) -> bytes:
+    """Number of free in-bounds neighbours per cell (flat, y * width + x), for corridor_bfs."""
+    free = np.pad(_obstacle_grid(width, height, obstacles) == 0, 1)
+    degree = free[:-2, 1:-1].astype(np.uint8) + free[2:, 1:-1] + free[1:-1, :-2] + free[1:-1, 2:]
+    return degree.tobytes()
+
+def _blocked_cells(obstacles, width: int, height: int) -> bytearray:
+    """Flat bytearray over cell index y * width + x with obstacle cells set to 1."""
+    cells = bytearray(width * height)
+    for x, y in obstacles:
+        if 0 <= x < width and 0 <= y < height:
+            cells[y * width + x] = 1
+    return cells
+
+def _guarded_cells(width: int, height: int, obstacles=(), mask: Optional[bytes] = None) -> bytearray:
+    """
+    Flat (height + 2) x (width + 2) bytearray with cell (x, y) at index
+    (y + 1) * (width + 2) + x + 1, set to 1 for obstacles (or copied from a
+    build_obstacle_mask mask) and surrounded by a ring of 1s.
+    """
+    row = width + 2
+    cells = bytearray(b"\x01") * (row * (height + 2))
+    empty = bytes(width)
+    for y in range(height):
+        start = (y + 1) * row + 1
+        cells[start:start + width] = empty if mask is None else mask[y * width:(y + 1) * width]
+    for x, y in obstacles:
+        if 0 <= x < width and 0 <= y < height:
+            cells[(y + 1) * row + x + 1] = 1
+    return cells
 
 class Router:
     """Pathfinding and navigation utilities."""
     
     @staticmethod
     def bfs(start: Tuple[int, int], goal: Tuple[int, int], 
-            obstacles: Set[Tuple[int, int]], width: int, height: int) -> List[Tuple[int, int]]:
+            obstacles: Set[Tuple[int, int]], width: int, height: int,
+            obstacles_version: Optional[Hashable] = None,
+            want: str = "full") -> Union[List[Tuple[int, int]], Tuple[int, int], array]:
         """
         Breadth-first search for pathfinding.
         Returns a path from start to goal, avoiding obstacles.
+        
+        Paths are memoized. The obstacles are keyed by their contents, or by
+        obstacles_version when given: a caller that keeps one obstacle set
+        can pass a counter it bumps on every change and skip hashing the set.
+        
+        With want="first_step" only the cell after start on the path is
+        returned (start itself if already there or unreachable), so a cached
+        path is not copied out just to take one step. With want="array" the
+        path is an array('i') of interleaved x, y (read it with path_step),
+        8 bytes per node instead of a list of tuples, for callers that keep it.
+        """
+        return Router._cached_search(Router._bfs, start, goal, obstacles, width, height, obstacles_version, want)
+    
+    @staticmethod
+    def astar(start: Tuple[int, int], goal: Tuple[int, int], 
+              obstacles: Set[Tuple[int, int]], width: int, height: int,
+              obstacles_version: Optional[Hashable] = None,
+              want: str = "full") -> Union[List[Tuple[int, int]], Tuple[int, int], array]:
+        """
+        A* search with the Manhattan distance heuristic.
+        Returns a shortest path from start to goal, avoiding obstacles, while
+        expanding far fewer cells than bfs on open maps. Memoized like bfs,
+        and takes want like bfs.
+        """
+        return Router._cached_search(Router._astar, start, goal, obstacles, width, height, obstacles_version, want)
+    
+    @staticmethod
+    def bidirectional_bfs(start: Tuple[int, int], goal: Tuple[int, int], 
+                          obstacles: Set[Tuple[int, int]], width: int, height: int,
+                          obstacles_version: Optional[Hashable] = None) -> List[Tuple[int, int]]:
+        """
+        Breadth-first search from start and goal at once, meeting in the middle.
+        Returns a shortest path like bfs (not necessarily the same one) while
+        expanding about half as many cells on long open routes. Memoized like bfs.
+        """
+        return Router._cached_search(Router._bidirectional_bfs, start, goal, obstacles, width, height, obstacles_version)
+    
+    @staticmethod
+    def corridor_bfs(start: Tuple[int, int], goal: Tuple[int, int], 
+                     obstacles: Set[Tuple[int, int]], width: int, height: int,
+                     obstacles_version: Optional[Hashable] = None) -> List[Tuple[int, int]]:
+        """
+        Shortest-path search that runs straight through corridors.
+        
+        A free cell with exactly two free neighbours is a corridor cell: the
+        search walks through runs of them in one step and only queues the
+        junction at the far end, so on maze-like maps it expands junctions
+        rather than every cell. Returns a shortest path like bfs (not
+        necessarily the same one). Memoized like bfs.
+        """
+        return Router._cached_search(Router._corridor_bfs, start, goal, obstacles, width, height, obstacles_version)
+    
+    @staticmethod
+    def compute_flow_field(goals, obstacles: Set[Tuple[int, int]], width: int, height: int,
+                           obstacles_version: Optional[Hashable] = None) -> np.ndarray:
+        """
+        Direction field toward the nearest of goals, from one multi-source BFS.
+        
+        Returns a (height, width) int8 array holding, per cell, the index into
+        _DIRECTIONS of the first step of a shortest path to the nearest goal,
+        or -1 where there is no step to take (goal cells, obstacles and cells
+        that cannot reach a goal). Agents heading to the same goals read their
+        next step from one field instead of each running a search. Fields are
+        cached by goals and obstacles (or obstacles_version, as in bfs).
+        """
+        goals = frozenset(tuple(g) for g in goals)
+        key = (goals, width, height, frozenset(obstacles) if obstacles_version is None else ("version", obstacles_version))
+        with _flow_cache_lock:
+            field = _flow_cache.get(key)
+            if field is not None:
+                _flow_cache.move_to_end(key)
+                return field
+        
+        size = width * height
+        # seen marks obstacles and visited cells alike, as in _bfs_cells
+        seen = _blocked_cells(obstacles, width, height)
+        field = np.full(size, -1, dtype=np.int8)
+        queue = deque()
+        for gx, gy in goals:
+            if 0 <= gx < width and 0 <= gy < height and not seen[gy * width + gx]:
+                seen[gy * width + gx] = 1
+                queue.append(gy * width + gx)
+        
+        # Searching outward from the goals, a cell discovered from i steps
+        # back toward i: direction 2 undoes direction 0, 3 undoes 1, and so on
+        while queue:
+            i = queue.popleft()
+            x = i % width
+            for j, ok, back in ((i + width, i + width < size, 2), (i + 1, x + 1 < width, 3),
+                                (i - width, i >= width, 0), (i - 1, x > 0, 1)):
+                if ok and not seen[j]:
+                    seen[j] = 1
+                    field[j] = back
+                    queue.append(j)
+        
+        field = field.reshape(height, width)
+        field.flags.writeable = False
+        with _flow_cache_lock:
+            _flow_cache[key] = field
+            while len(_flow_cache) > _FLOW_CACHE_MAXSIZE:
+                _flow_cache.popitem(last=False)
+        return field
+    
+    @staticmethod
+    def make_bfs(width: int, height: int):
+        """
+        BFS bound to one grid size: bfs(start, goal, obstacles) -> path.
+        
+        Returns the same paths as bfs, without the path cache, for runs whose
+        grid never changes size. The search itself is Router._bfs: the numba
+        kernel when numba is installed, else the pure-Python _bfs_cells.
+        """
+        def bfs(start, goal, obstacles):
+            return _path_nodes(Router._bfs(tuple(start), tuple(goal), obstacles, width, height))
+        return bfs
+    
+    @staticmethod
+    def build_obstacle_mask(obstacles: Set[Tuple[int, int]], width: int, height: int) -> bytes:
+        """
+        Flatten obstacles into a mask for bfs_mask: bytes of length
+        width * height with 1 at index y * width + x for each obstacle.
+        
+        Build it once whenever the obstacles change and share it between
+        every agent's search that tick.
         """
-        queue = deque([(start, [])])
-        visited = set([start])
+        return bytes(_blocked_cells(obstacles, width, height))
+    
+    @staticmethod
+    def bfs_mask(start: Tuple[int, int], goal: Tuple[int, int], 
+                 mask: bytes, width: int, height: int) -> List[Tuple[int, int]]:
+        """
+        Breadth-first search like bfs, over a mask from build_obstacle_mask.
+        Each obstacle check is an indexed byte load instead of a tuple hash.
+        Memoized like bfs, keyed by the mask itself.
+        """
+        start, goal = tuple(start), tuple(goal)
+        grid_key = (width, height, ("mask", mask))
+        path = _path_cache_lookup((start, goal) + grid_key)
+        if path is None:
+            path = Router._bfs_mask(start, goal, mask, width, height)
+            _path_cache_store(start, goal, grid_key, path)
+            path = _path_nodes(path)
+        return path
+    
+    @staticmethod
+    def _cached_search(search, start, goal, obstacles, width, height, obstacles_version, want="full"):
+        """Run search through the path cache; any shortest path may answer any search."""
+        start, goal = tuple(start), tuple(goal)
+        grid_key = (width, height, frozenset(obstacles) if obstacles_version is None else ("version", obstacles_version))
+        path = _path_cache_lookup((start, goal) + grid_key, want)
+        if path is None:
+            # The full path is built either way: every node on it is cached.
+            # BFS returns it flat already; the other searches return tuples.
+            path = search(start, goal, obstacles, width, height)
+            flat = path if isinstance(path, array) else _path_array(path)
+            _path_cache_store(start, goal, grid_key, flat)
+            if want == "full" and not isinstance(path, array):
+                return path
+            return _path_view(flat, 0, want, start)
+        return path
+    
+    @staticmethod
+    def _bfs(start: Tuple[int, int], goal: Tuple[int, int], 
+             obstacles: Set[Tuple[int, int]], width: int, height: int) -> array:
+        """Uncached breadth-first search behind Router.bfs; the path is a flat array('i')."""
+        (sx, sy), (gx, gy) = start, goal
+        if not (0 <= sx < width and 0 <= sy < height and 0 <= gx < width and 0 <= gy < height):
+            return array('i', start if start == goal else ())
+        
+        if bfs_grid is not None:
+            # (L, 2) int32 rows of x, y are already the flat layout
+            return array('i', bfs_grid(_obstacle_grid(width, height, frozenset(obstacles)), sx, sy, gx, gy).tobytes())
+        
+        return Router._bfs_cells(start, goal, _guarded_cells(width, height, obstacles=obstacles), width, height)
+    
+    @staticmethod
+    def _bfs_mask(start: Tuple[int, int], goal: Tuple[int, int], 
+                  mask: bytes, width: int, height: int) -> array:
+        """Uncached breadth-first search behind Router.bfs_mask; the path is a flat array('i')."""
+        (sx, sy), (gx, gy) = start, goal
+        if not (0 <= sx < width and 0 <= sy < height and 0 <= gx < width and 0 <= gy < height):
+            return array('i', start if start == goal else ())
         
+        if bfs_grid is not None:
+            return array('i', bfs_grid(np.frombuffer(mask, dtype=np.uint8).reshape(height, width), sx, sy, gx, gy).tobytes())
+        
+        return Router._bfs_cells(start, goal, _guarded_cells(width, height, mask=mask), width, height)
+    
+    @staticmethod
+    def _bfs_cells(start: Tuple[int, int], goal: Tuple[int, int], 
+                   seen: bytearray, width: int, height: int) -> array:
+        """
+        Pure-Python BFS over a _guarded_cells bytearray, which it marks as
+        visited. The path is a flat array('i') of interleaved x, y.
+        """
+        (sx, sy), (gx, gy) = start, goal
+        # Cell (x, y) is at (y + 1) * row + x + 1 inside a ring of blocked
+        # cells. seen marks the ring, obstacles and visited cells alike, so
+        # each neighbour check is a single byte load with no bounds tests.
+        row = width + 2
+        parent = array('i', [-1]) * len(seen)
+        
+        start_index = (sy + 1) * row + sx + 1
+        goal_index = (gy + 1) * row + gx + 1
+        if start_index == goal_index:
+            return array('i', start)
+        if seen[goal_index]:
+            return array('i')  # Goal is an obstacle
+        seen[start_index] = 1
+        parent[start_index] = start_index
+        queue = deque([start_index])
+        
+        # The goal is checked as it is discovered, so the search stops one
+        # queue round early; its parent is the same as when checked at pop.
         while queue:
-            (x, y), path = queue.popleft()
+            i = queue.popleft()
+            
+            # Neighbours unrolled, in the order (0, 1), (1, 0), (0, -1), (-1, 0)
+            j = i + row
+            if not seen[j]:
+                seen[j] = 1
+                parent[j] = i
+                if j == goal_index:
+                    break
+                queue.append(j)
+            j = i + 1
+            if not seen[j]:
+                seen[j] = 1
+                parent[j] = i
+                if j == goal_index:
+                    break
+                queue.append(j)
+            j = i - row
+            if not seen[j]:
+                seen[j] = 1
+                parent[j] = i
+                if j == goal_index:
+                    break
+                queue.append(j)
+            j = i - 1
+            if not seen[j]:
+                seen[j] = 1
+                parent[j] = i
+                if j == goal_index:
+                    break
+                queue.append(j)
+        else:
+            return array('i')  # No path found
+        
+        # Walk the parent chain back to start once, at the goal, straight
+        # into the flat array: y before x, so reversing yields x, y order
+        i = goal_index
+        path = array('i', (gy, gx))
+        while i != start_index:
+            i = parent[i]
+            path.append(i // row - 1)
+            path.append(i % row - 1)
+        path.reverse()
+        return path
+    
+    @staticmethod
+    def _bidirectional_bfs(start: Tuple[int, int], goal: Tuple[int, int], 
+                           obstacles: Set[Tuple[int, int]], width: int, height: int) -> List[Tuple[int, int]]:
+        """Uncached bidirectional search behind Router.bidirectional_bfs."""
+        (sx, sy), (gx, gy) = start, goal
+        if start == goal or not (0 <= sx < width and 0 <= sy < height and 0 <= gx < width and 0 <= gy < height):
+            return [start] if start == goal else []
+        
+        size = width * height
+        start_index = sy * width + sx
+        goal_index = gy * width + gx
+        # state: 1 = obstacle, 2 = reached from start, 3 = reached from goal.
+        # Each cell belongs to one side, so one parent/dist array serves both.
+        state = _blocked_cells(obstacles, width, height)
+        if state[goal_index]:
+            return []
+        parent = array('i', [-1]) * size
+        dist = array('i', [0]) * size
+        state[start_index], state[goal_index] = 2, 3
+        parent[start_index], parent[goal_index] = start_index, goal_index
+        frontiers = {2: [start_index], 3: [goal_index]}
+        
+        while frontiers[2] and frontiers[3]:
+            # Grow the smaller frontier by one whole level
+            side = 2 if len(frontiers[2]) <= len(frontiers[3]) else 3
+            other = 5 - side
+            next_frontier = []
+            meet, meet_length = None, size
+            
+            for i in frontiers[side]:
+                x = i % width
+                d = dist[i] + 1
+                for j in (i + width if i + width < size else -1, i + 1 if x + 1 < width else -1,
+                          i - width, i - 1 if x > 0 else -1):
+                    if j < 0:
+                        continue
+                    cell = state[j]
+                    if cell == 0:
+                        state[j] = side
+                        parent[j] = i
+                        dist[j] = d
+                        next_frontier.append(j)
+                    elif cell == other and d + dist[j] < meet_length:
+                        # Keep the shortest meeting across the whole level
+                        meet, meet_length = (i, j) if side == 2 else (j, i), d + dist[j]
+            
+            if meet is not None:
+                i, j = meet
+                path = [(i % width, i // width)]
+                while i != start_index:
+                    i = parent[i]
+                    path.append((i % width, i // width))
+                path.reverse()
+                path.append((j % width, j // width))
+                while j != goal_index:
+                    j = parent[j]
+                    path.append((j % width, j // width))
+                return path
+            
+            frontiers[side] = next_frontier
+        
+        return []  # No path found
+    
+    @staticmethod
+    def _corridor_bfs(start: Tuple[int, int], goal: Tuple[int, int], 
+                      obstacles: Set[Tuple[int, int]], width: int, height: int) -> List[Tuple[int, int]]:
+        """Uncached corridor-skipping search behind Router.corridor_bfs."""
+        (sx, sy), (gx, gy) = start, goal
+        if start == goal or not (0 <= sx < width and 0 <= sy < height and 0 <= gx < width and 0 <= gy < height):
+            return [start] if start == goal else []
+        
+        size = width * height
+        start_index = sy * width + sx
+        goal_index = gy * width + gx
+        blocked = _blocked_cells(obstacles, width, height)
+        if blocked[goal_index]:
+            return []
+        degree = _free_degree(width, height, frozenset(obstacles))
+        
+        def free_neighbours(i):
+            x = i % width
+            return [j for j in (i + width if i + width < size else -1, i + 1 if x + 1 < width else -1,
+                                i - width, i - 1 if x > 0 else -1) if j >= 0 and not blocked[j]]
+        
+        # Corridor walks give edges longer than one step, so junctions are
+        # settled in distance order from a heap (Dijkstra over the junctions)
+        dist = array('i', [size]) * size
+        parent = array('i', [-1]) * size
+        dist[start_index] = 0
+        parent[start_index] = start_index
+        heap = [(0, start_index)]
+        
+        while heap:
+            d, i = heapq.heappop(heap)
+            if i == goal_index:
+                break
+            if d > dist[i]:
+                continue  # Stale entry
             
-            if (x, y) == goal:
-                return path + [(x, y)]
+            for j in free_neighbours(i):
+                prev, k = i, d + 1
+                # Relax each corridor cell on the way; a cell already reached
+                # as cheaply from the other end stops the walk, so a closed
+                # loop of corridor cells cannot be walked forever
+                while k < dist[j]:
+                    dist[j] = k
+                    parent[j] = prev
+                    if j == goal_index or degree[j] != 2:
+                        heapq.heappush(heap, (k, j))
+                        break
+                    onward = [n for n in free_neighbours(j) if n != prev]
+                    if len(onward) != 1:
+                        heapq.heappush(heap, (k, j))  # A blocked start can hide a branch
+                        break
+                    prev, j, k = j, onward[0], k + 1
+        else:
+            return []  # No path found
+        
+        i = goal_index
+        path = [(gx, gy)]
+        while i != start_index:
+            i = parent[i]
+            path.append((i % width, i // width))
+        path.reverse()
+        return path
+    
+    @staticmethod
+    def _astar(start: Tuple[int, int], goal: Tuple[int, int], 
+               obstacles: Set[Tuple[int, int]], width: int, height: int) -> List[Tuple[int, int]]:
+        """Uncached A* search behind Router.astar."""
+        (sx, sy), (gx, gy) = start, goal
+        if start == goal or not (0 <= sx < width and 0 <= sy < height and 0 <= gx < width and 0 <= gy < height):
+            return [start] if start == goal else []
+        
+        # Cells are packed into flat ints y * width + x, as in build_obstacle_mask:
+        # an int hashes to itself, so set and dict probes skip tuple hashing
+        blocked = {y * width + x for x, y in obstacles if 0 <= x < width and 0 <= y < height}
+        start_index = sy * width + sx
+        goal_index = gy * width + gx
+        
+        # Open set ordered by f, then by larger g (deeper first) to break ties
+        open_heap = [(abs(sx - gx) + abs(sy - gy), 0, start_index)]
+        g_score = {start_index: 0}
+        parent = {start_index: -1}
+        h_cache = {}
+        
+        while open_heap:
+            _, neg_g, node = heapq.heappop(open_heap)
+            g = -neg_g
             
-            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            if node == goal_index:
+                path = []
+                while node != -1:
+                    path.append((node % width, node // width))
+                    node = parent[node]
+                path.reverse()
+                return path
+            
+            if g > g_score[node]:
+                continue  # Stale entry; node was reached more cheaply since
+            
+            x, y = node % width, node // width
+            for dx, dy in _DIRECTIONS:
                 nx, ny = x + dx, y + dy
+                neighbor = ny * width + nx
                 
                 if (0 <= nx < width and 0 <= ny < height and 
-                    (nx, ny) not in obstacles and 
-                    (nx, ny) not in visited):
+                    neighbor not in blocked and 
+                    g + 1 < g_score.get(neighbor, g + 2)):
                     
-                    queue.append(((nx, ny), path + [(x, y)]))
-                    visited.add((nx, ny))
+                    g_score[neighbor] = g + 1
+                    parent[neighbor] = node
+                    h = h_cache.get(neighbor)
+                    if h is None:
+                        h = h_cache[neighbor] = abs(nx - gx) + abs(ny - gy)
+                    heapq.heappush(open_heap, (g + 1 + h, -(g + 1), neighbor))
         
         return []  # No path found
     
     @staticmethod
     def get_next_step_toward(start: Tuple[int, int], goal: Tuple[int, int], 
-                            obstacles: Set[Tuple[int, int]], width: int, height: int) -> Tuple[int, int]:
+                            obstacles: Set[Tuple[int, int]], width: int, height: int,
+                            obstacles_version: Optional[Hashable] = None,
+                            flow_field: Optional[np.ndarray] = None) -> Tuple[int, int]:
         """
         Get the next step toward a goal, avoiding obstacles.
+        
+        flow_field, if given, is compute_flow_field([goal], ...) for the same
+        obstacles; the step is then read from it instead of searched for.
         """
-        path = Router.bfs(start, goal, obstacles, width, height)
-        if len(path) > 1:
-            return path[1]  # Next step after current position
-        return start  # Stay in place if no path found
+        if flow_field is not None and start not in obstacles:
+            x, y = start
+            direction = flow_field[y, x] if 0 <= x < width and 0 <= y < height else -1
+            if direction < 0:
+                return start  # At the goal, or no path
+            dx, dy = _DIRECTIONS[direction]
+            return (x + dx, y + dy)
+        
+        # Next step after current position, or start if no path found
+        return Router.astar(start, goal, obstacles, width, height, obstacles_version, want="first_step")
+    
+    @staticmethod
+    def path_step(path: array, i: int) -> Tuple[int, int]:
+        """Node i of a path returned with want="array", as an (x, y) tuple."""
+        return (path[2 * i], path[2 * i + 1])
     
     @staticmethod
     def distance(pos1: Tuple[int, int], pos2: Tuple[int, int]) -> int:
         """Calculate Manhattan distance between two points."""
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
\ No newline at end of file
+        # Unpacked once and compared inline: no subscripts or abs() calls
+        x1, y1 = pos1
+        x2, y2 = pos2
+        return (x1 - x2 if x1 >= x2 else x2 - x1) + (y1 - y2 if y1 >= y2 else y2 - y1)
\ No newline at end of file